@@ -0,0 +1,75 @@
+# Microbenchmark for the repeating key XOR cipher
+# Compares the old per byte loop against xor_encrypt / xor_decrypt for payloads from 1 KB to 64 MB
+#
+#   python benchmarks/bench_xor.py
+#   python benchmarks/bench_xor.py --max-size 4194304 --repeat 5
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from encrypt import xor_encrypt
+from decrypt import xor_decrypt
+
+
+def xor_loop(message_bytes, key):
+    # The original implementation , kept here as the reference
+    key_bytes = key.encode("ascii")
+    encrypted = bytearray()
+
+    for i in range(len(message_bytes)):
+        encrypted.append(message_bytes[i] ^ key_bytes[i % len(key_bytes)])
+
+    return encrypted
+
+
+def best_time(fn, payload, key, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload, key)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bulk XOR cipher against the per byte loop")
+    parser.add_argument("--min-size", type=int, default=1024)
+    parser.add_argument("--max-size", type=int, default=64 * 1024 * 1024)
+    parser.add_argument("--key", default="PixelGuardKey")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-loop-above", type=int, default=64 * 1024 * 1024,
+                        help="only time the slow loop up to this size")
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'loop (s)':>10} {'bulk (s)':>10} {'speedup':>9} {'bulk MB/s':>10}")
+    size = args.min_size
+    while size <= args.max_size:
+        payload = os.urandom(size)
+
+        encrypted = xor_encrypt(payload, args.key)
+        if xor_decrypt(encrypted, args.key) != payload:
+            raise SystemExit(f"Round trip failed at {size} bytes")
+
+        bulk = best_time(xor_encrypt, payload, args.key, args.repeat)
+        if size <= args.skip_loop_above:
+            if xor_loop(payload, args.key) != encrypted:
+                raise SystemExit(f"Bulk output differs from the loop at {size} bytes")
+            loop = best_time(xor_loop, payload, args.key, 1 if size > 1024 * 1024 else args.repeat)
+            loop_text = f"{loop:10.4f}"
+            speedup_text = f"{loop / bulk:8.1f}x"
+        else:
+            loop_text = f"{'-':>10}"
+            speedup_text = f"{'-':>9}"
+
+        rate = size / bulk / (1024 * 1024)
+        print(f"{size:>10} {loop_text} {bulk:10.4f} {speedup_text} {rate:10.1f}")
+        size *= 4
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# Benchmark suite for the encode / decode hot paths
+#
+# Generates synthetic covers and payloads , times each stage separately for mode 1 and mode 3
+# and writes a JSON report. A report can be saved as a baseline and later runs compared to it.
+#
+#   python benchmarks/suite.py --quick
+#   python benchmarks/suite.py --out report.json --save-baseline baseline.json
+#   python benchmarks/suite.py --baseline baseline.json --threshold 0.25   (exit code 1 on regression)
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import PIL
+from PIL import Image
+
+from encrypt import build_bitstream, embed_bits, xor_encrypt
+from decrypt import decode_message, extract_bits, extract_message_bits
+from plane_cache import PLANES
+
+DEFAULT_MEGAPIXELS = [0.1, 1, 12, 48]
+DEFAULT_PAYLOADS = [16, 1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024]
+QUICK_MEGAPIXELS = [0.1, 1]
+QUICK_PAYLOADS = [16, 1024, 64 * 1024]
+KEY = "benchmark-key"
+
+
+def make_cover(workdir, megapixels):
+    # Noise image with a 4:3 aspect ratio , cached between runs
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(megapixels * 1_000_000 / width)
+    path = os.path.join(workdir, f"cover_{width}x{height}.png")
+    if not os.path.exists(path):
+        rng = np.random.default_rng(width * height)
+        pixels = rng.integers(1, 256, (height, width, 3), dtype=np.uint8)
+        Image.fromarray(pixels, "RGB").save(path, compress_level=1)
+    return path, width * height
+
+
+def make_message(size):
+    # Printable ASCII so build_bitstream accepts it
+    rng = np.random.default_rng(size)
+    return rng.integers(32, 127, size, dtype=np.uint8).tobytes().decode("ascii")
+
+
+def best_of(repeat, fn, *args, **kwargs):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(megapixels, payloads, repeat, workdir, legacy_max_mp, report=print):
+    results = []
+
+    def record(name, seconds, **params):
+        entry = {"name": name, **params, "seconds": seconds}
+        results.append(entry)
+        details = " ".join(f"{k}={v}" for k, v in params.items())
+        report(f"{name:<28} {details:<45} {seconds * 1000:10.3f} ms")
+
+    messages = {size: make_message(size) for size in payloads}
+
+    for size, message in messages.items():
+        message_bytes = message.encode("ascii")
+        record("xor_encrypt", best_of(repeat, xor_encrypt, message_bytes, KEY), payload_bytes=size)
+        for mode in (1, 3):
+            record("build_bitstream", best_of(repeat, build_bitstream, message, KEY, mode), mode=mode, payload_bytes=size)
+            bits = build_bitstream(message, KEY, mode)
+            record("decode_message", best_of(repeat, decode_message, bits, KEY), mode=mode, payload_bytes=size)
+
+    for mp in megapixels:
+        cover, pixels = make_cover(workdir, mp)
+        for mode in (1, 3):
+            capacity = pixels * (1 if mode == 1 else 3)
+            for size, message in messages.items():
+                bits = build_bitstream(message, KEY, mode)
+                if len(bits) > capacity:
+                    continue  # payload does not fit this cover
+                stego = os.path.join(workdir, f"stego_{mp}_{mode}_{size}.png")
+                params = {"mode": mode, "megapixels": mp, "payload_bytes": size}
+                record("embed_bits", best_of(repeat, embed_bits, cover, bits, mode, stego), **params)
+                # Timed without PLANES , or every repeat after the first would be a cache lookup
+                record("extract_message_bits", best_of(repeat, extract_message_bits, stego, cache=False), **params)
+                extract_message_bits(stego)
+                record("extract_message_bits_cached", best_of(repeat, extract_message_bits, stego), **params)
+                PLANES.clear()
+                os.remove(stego)
+            if mp <= legacy_max_mp:
+                # The full image extraction does not depend on the payload , time it once per cover
+                record("extract_bits", best_of(repeat, extract_bits, cover, mode, cache=False), mode=mode, megapixels=mp)
+
+    return results
+
+
+def result_key(entry):
+    return "|".join(f"{k}={entry[k]}" for k in sorted(entry) if k != "seconds")
+
+
+def compare(results, baseline, threshold, min_seconds, report=print):
+    # Returns the entries slower than baseline * (1 + threshold)
+    previous = {result_key(e): e["seconds"] for e in baseline["results"]}
+    regressions = []
+    for entry in results:
+        old = previous.get(result_key(entry))
+        if old is None or max(old, entry["seconds"]) < min_seconds:
+            continue
+        ratio = entry["seconds"] / old if old else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append({**entry, "baseline_seconds": old, "ratio": ratio})
+            report(f"REGRESSION {result_key(entry)}: {old * 1000:.3f} ms -> {entry['seconds'] * 1000:.3f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the steganography encode / decode stages")
+    parser.add_argument("--megapixels", type=float, nargs="+", help=f"cover sizes (default: {DEFAULT_MEGAPIXELS})")
+    parser.add_argument("--payloads", type=int, nargs="+", help="payload sizes in bytes (default: 16 B to 16 MB)")
+    parser.add_argument("--quick", action="store_true", help="small covers and payloads only")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement , the best is kept")
+    parser.add_argument("--workdir", help="where synthetic covers are cached (default: a temp directory)")
+    parser.add_argument("--legacy-max-mp", type=float, default=1, help="only time full image extract_bits up to this size")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--save-baseline", help="also save the report as a baseline file")
+    parser.add_argument("--baseline", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.001, help="ignore timings shorter than this when comparing")
+    args = parser.parse_args()
+
+    megapixels = args.megapixels or (QUICK_MEGAPIXELS if args.quick else DEFAULT_MEGAPIXELS)
+    payloads = args.payloads or (QUICK_PAYLOADS if args.quick else DEFAULT_PAYLOADS)
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), "pixelguard-bench")
+    os.makedirs(workdir, exist_ok=True)
+
+    log = lambda line: print(line, file=sys.stderr)
+    results = run(megapixels, payloads, args.repeat, workdir, args.legacy_max_mp, report=log)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pillow": PIL.__version__,
+            "numpy": np.__version__,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_seconds, report=log)
+        if regressions:
+            log(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        log("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from functools import partial
+from multiprocessing import Pool, TimeoutError as PoolTimeout
+
+from PIL import Image
+
+from encrypt import MODE_BITS, SAVE_PROFILES, build_bitstream, embed_bits
+from timing import format_timings
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+def find_covers(directory):
+    names = sorted(os.listdir(directory))
+    return [os.path.join(directory, n) for n in names if n.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def jobs_from_directory(directory, message, key, mode, out_dir, extension=".png"):
+    jobs = []
+    for path in find_covers(directory):
+        name = os.path.splitext(os.path.basename(path))[0] + extension
+        jobs.append((path, message, key, mode, os.path.join(out_dir, name)))
+    return jobs
+
+
+def jobs_from_manifest(manifest_path, out_dir, default_key=None, default_mode=3, extension=".png"):
+    # CSV with an image and message column , key / mode / output are optional per row
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            image = os.path.join(base, row["image"])
+            key = row.get("key") or default_key
+            mode = int(row.get("mode") or default_mode)
+            output = row.get("output") or os.path.splitext(os.path.basename(image))[0] + extension
+            jobs.append((image, row["message"], key, mode, os.path.join(out_dir, output)))
+    return jobs
+
+
+def check_outputs(jobs):
+    # Covers with the same name but another extension (a.png , a.jpg) would overwrite each other's output
+    seen = {}
+    for job in jobs:
+        output = os.path.normcase(os.path.abspath(job[4]))
+        if output in seen:
+            raise ValueError(f"{seen[output]} and {job[0]} would both be written to {job[4]}")
+        seen[output] = job[0]
+
+
+def encode_one(job, max_memory=None, profile="default", compress=None, checksum=False):
+    # Runs in a worker process , same calls as a single encrypt.py run so the output is identical
+    image_path, message, key, mode, output_path = job
+    start = time.perf_counter()
+    try:
+        if not key:
+            raise ValueError("No encryption key")
+        with Image.open(image_path) as img:
+            width, height = img.size
+        timings = {}
+        embed_bits(image_path, build_bitstream(message, key, mode, compress=compress, checksum=checksum), mode, output_path,
+                   max_memory=max_memory, profile=profile, timings=timings)
+        return {"image": image_path, "output": output_path, "ok": True, "pixels": width * height,
+                "seconds": time.perf_counter() - start, "timings": timings}
+    except Exception as e:
+        return {"image": image_path, "output": output_path, "ok": False,
+                "error": str(e), "seconds": time.perf_counter() - start}
+
+
+def run_batch(jobs, workers=None, report=print, max_memory=None, profile="default", show_timings=False,
+              on_result=None, cancel=None, compress=None, checksum=False):
+    # on_result is called with each result dict as it arrives , cancel (anything with is_set())
+    # stops the pool and removes half written outputs
+    workers = workers or os.cpu_count() or 1
+    results = []
+    start = time.perf_counter()
+
+    with Pool(processes=min(workers, max(len(jobs), 1))) as pool:
+        it = pool.imap_unordered(partial(encode_one, max_memory=max_memory, profile=profile, compress=compress,
+                                         checksum=checksum), jobs)
+        while True:
+            # A large cover can take a while , so cancel is checked between results as well as after each one
+            if cancel is not None and cancel.is_set():
+                break  # leaving the with block terminates the workers
+            try:
+                result = it.next(timeout=0.1)
+            except PoolTimeout:
+                continue
+            except StopIteration:
+                break
+            if on_result is not None:
+                on_result(result)
+            if cancel is not None and cancel.is_set():
+                break
+            if result["ok"]:
+                report(f"OK    {result['image']} -> {result['output']} ({result['seconds']:.2f}s)")
+                if show_timings:
+                    report(format_timings(result["timings"]))
+            else:
+                report(f"FAIL  {result['image']}: {result['error']}")
+            results.append(result)
+
+    if cancel is not None and cancel.is_set():
+        for job in jobs:
+            part = job[4] + ".part"
+            if os.path.exists(part):
+                os.remove(part)
+
+    elapsed = time.perf_counter() - start
+    done = [r for r in results if r["ok"]]
+    megapixels = sum(r["pixels"] for r in done) / 1_000_000
+    stages = {}
+    for r in done:
+        for name, seconds in r["timings"]["stages"].items():
+            stages[name] = stages.get(name, 0.0) + seconds
+    summary = {
+        "images": len(results),
+        "succeeded": len(done),
+        "failed": len(results) - len(done),
+        "seconds": elapsed,
+        "images_per_second": len(done) / elapsed if elapsed else 0.0,
+        "megapixels_per_second": megapixels / elapsed if elapsed else 0.0,
+        "stage_seconds": stages,
+    }
+    return results, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode messages into many cover images in parallel")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help="directory of cover images , all get the same message")
+    source.add_argument("--manifest", help="CSV with image,message[,key,mode,output] columns")
+    parser.add_argument("--out", required=True, help="directory for the encoded images")
+    parser.add_argument("--message", help="message to hide (with --dir)")
+    parser.add_argument("--message-file", help="read the message from a text file (with --dir)")
+    parser.add_argument("--key", help="encryption key (default key for manifest rows)")
+    parser.add_argument("--mode", type=int, choices=sorted(MODE_BITS), default=3, help="bits hidden per pixel (default: 3)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument("--profile", choices=sorted(SAVE_PROFILES), default="default", help="output format / compression")
+    parser.add_argument("--max-memory", type=int, help="stream PNG covers in stripes using about this many MB per worker")
+    parser.add_argument("--timings", action="store_true", help="print a per stage timing breakdown")
+    parser.add_argument("--compress", nargs="?", const="auto", choices=("auto", "zlib", "bz2", "lzma"),
+                        help="compress messages before encrypting (default method: auto)")
+    parser.add_argument("--checksum", action="store_true", help="store a CRC32 so a wrong key is rejected straight away")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    extension = SAVE_PROFILES[args.profile][1]
+
+    if args.dir:
+        if args.message_file:
+            with open(args.message_file, encoding="ascii") as f:
+                message = f.read()
+        else:
+            message = args.message
+        if message is None or not args.key:
+            parser.error("--dir needs --message (or --message-file) and --key")
+        jobs = jobs_from_directory(args.dir, message, args.key, args.mode, args.out, extension)
+    else:
+        jobs = jobs_from_manifest(args.manifest, args.out, args.key, args.mode, extension)
+
+    if not jobs:
+        print("No cover images found.")
+        return 1
+    try:
+        check_outputs(jobs)
+    except ValueError as e:
+        parser.error(f"{e} , rename one of them or set its output in a manifest")
+
+    print(f"=================Batch Encoder ({len(jobs)} images , {args.workers} workers) ==================")
+    max_memory = args.max_memory * 1024 * 1024 if args.max_memory else None
+    results, summary = run_batch(jobs, args.workers, max_memory=max_memory, profile=args.profile,
+                                 show_timings=args.timings, compress=args.compress, checksum=args.checksum)
+
+    print(f"\n{summary['succeeded']} encoded , {summary['failed']} failed in {summary['seconds']:.2f}s")
+    print(f"{summary['images_per_second']:.2f} images/s , {summary['megapixels_per_second']:.2f} megapixels/s")
+    if args.timings:
+        print("Time per stage across all workers:")
+        for name, seconds in summary["stage_seconds"].items():
+            print(f"  {name:<12} {seconds:10.3f} s")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+CHUNK_BYTES = 1 << 20  # bytes unpacked at a time when a stream is consumed in pieces
+
+
+class Bitstream:
+    # Bits packed 8 per byte , most significant bit first (the same order format(byte , '08b') gives)
+    # length is the number of real bits , the unused low bits of the last byte are zero
+    def __init__(self, data=b"", length=None):
+        self.data = bytes(data)
+        self.length = len(self.data) * 8 if length is None else length
+        if self.length > len(self.data) * 8:
+            raise ValueError("Bitstream length is longer than its data")
+
+    @classmethod
+    def from_int(cls, value, length):
+        pad = -length % 8
+        return cls((value << pad).to_bytes((length + pad) // 8, "big"), length)
+
+    @classmethod
+    def from_string(cls, bits):
+        # Legacy '0'/'1' string form
+        return cls.from_int(int(bits, 2) if bits else 0, len(bits))
+
+    @classmethod
+    def from_array(cls, bits):
+        # NumPy array of 0/1 values
+        return cls(np.packbits(bits.astype(np.uint8)).tobytes(), len(bits))
+
+    @classmethod
+    def concat(cls, *streams):
+        value = 0
+        length = 0
+        for s in streams:
+            value = (value << s.length) | s.to_int()
+            length += s.length
+        return cls.from_int(value, length)
+
+    def to_int(self):
+        return int.from_bytes(self.data, "big") >> (len(self.data) * 8 - self.length)
+
+    def read_int(self, start, count):
+        # Value of bits [start , start + count) without unpacking the whole stream
+        count = max(0, min(count, self.length - start))
+        if count == 0:
+            return 0
+        first = start // 8
+        last = (start + count + 7) // 8
+        chunk = int.from_bytes(self.data[first:last], "big")
+        return (chunk >> ((last * 8) - (start + count))) & ((1 << count) - 1)
+
+    def read_bytes(self, start, n_bytes):
+        # n_bytes whole bytes starting at any bit offset , cut short at the end of the stream
+        n_bytes = max(0, min(n_bytes, (self.length - start) // 8))
+        if start % 8 == 0:
+            return self.data[start // 8:start // 8 + n_bytes]
+        return self.read_int(start, n_bytes * 8).to_bytes(n_bytes, "big")
+
+    def pieces(self, size=CHUNK_BYTES):
+        # The stream cut into Bitstreams of at most size bytes , front to back
+        for i in range(0, len(self.data), size):
+            yield Bitstream(self.data[i:i + size], min(size * 8, self.length - i * 8))
+
+    def reader(self, size=CHUNK_BYTES):
+        # size bytes are unpacked at a time , to one byte per bit
+        return BitReader(self.pieces(size))
+
+    def unpack(self):
+        # NumPy uint8 array with one 0/1 value per bit
+        return np.unpackbits(np.frombuffer(self.data, dtype=np.uint8), count=self.length)
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        if self.length == 0:
+            return ""
+        return format(self.to_int(), f"0{self.length}b")
+
+    def __getitem__(self, index):
+        # Indexing and slicing behave like the legacy string so old callers keep working
+        if isinstance(index, slice):
+            return str(self)[index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("Bitstream index out of range")
+        return "1" if self.data[index // 8] >> (7 - index % 8) & 1 else "0"
+
+    def __eq__(self, other):
+        if isinstance(other, Bitstream):
+            return self.length == other.length and self.data == other.data
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Bitstream(length={self.length})"
+
+
+class BitReader:
+    # Hands out the bits of a stream front to back , n at a time , unpacking only the pieces it needs
+    # pieces is an iterable of Bitstreams , take() returns a 0/1 NumPy array (a '0'/'1' str without NumPy)
+    def __init__(self, pieces):
+        self._pieces = iter(pieces)
+        self._buffer = np.zeros(0, dtype=np.uint8) if HAS_NUMPY else ""
+        self._pos = 0
+
+    def take(self, n):
+        # Fewer than n bits come back only at the end of the stream
+        while len(self._buffer) - self._pos < n:
+            piece = next(self._pieces, None)
+            if piece is None:
+                break
+            rest = self._buffer[self._pos:]
+            if HAS_NUMPY:
+                self._buffer = np.concatenate([rest, piece.unpack()])
+            else:
+                self._buffer = rest + str(piece)
+            self._pos = 0
+        bits = self._buffer[self._pos:self._pos + n]
+        self._pos += n
+        return bits
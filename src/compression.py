@@ -0,0 +1,88 @@
+import bz2
+import lzma
+import zlib
+
+METHODS = ("none", "zlib", "bz2", "lzma")  # the position is the code stored in the header flags
+AUTO_MIN_BYTES = 64  # shorter messages are not worth the extra header bytes
+AUTO_TRY_ALL_BYTES = 1024 * 1024  # above this only zlib is tried , bz2 / lzma get slow
+EXTENDED_HEADER_BYTES = 4  # version + flags + "PG" signature , only written when the payload is compressed
+LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]  # raw stream , no container overhead
+ERRORS = (zlib.error, lzma.LZMAError, OSError, EOFError)  # what a damaged stream raises (bz2 uses OSError)
+
+
+def compress(data, method, level=9):
+    if method == "zlib":
+        return zlib.compress(data, level)
+    if method == "bz2":
+        return bz2.compress(data)
+    if method == "lzma":
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+    if method == "none":
+        return bytes(data)
+    raise ValueError(f"Unknown compression method: {method}")
+
+
+def decompress(data, method, max_size=None):
+    # max_size: raise ValueError rather than expand past it , a crafted payload of a few KB can inflate to gigabytes
+    if max_size is not None and method != "none":
+        unpacker = decompressor(method)
+        data = decompress_part(unpacker, data, max_size)
+        if not unpacker.eof:
+            raise EOFError("Compressed data ended before the end-of-stream marker")
+        return data
+    if method == "zlib":
+        return zlib.decompress(data)
+    if method == "bz2":
+        return bz2.decompress(data)
+    if method == "lzma":
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+    if method == "none":
+        return bytes(data)
+    raise ValueError(f"Unknown compression method: {method}")
+
+
+def compressor(method, level=9):
+    # Incremental form for payloads streamed from disk , compress() / flush() like zlib.compressobj
+    if method == "zlib":
+        return zlib.compressobj(level)
+    if method == "bz2":
+        return bz2.BZ2Compressor(level)
+    if method == "lzma":
+        return lzma.LZMACompressor(format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+    raise ValueError(f"Unknown compression method: {method}")
+
+
+def decompressor(method):
+    # Only the zlib object has a flush() , callers check for it
+    if method == "zlib":
+        return zlib.decompressobj()
+    if method == "bz2":
+        return bz2.BZ2Decompressor()
+    if method == "lzma":
+        return lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+    raise ValueError(f"Unknown compression method: {method}")
+
+
+def decompress_part(unpacker, data, max_size):
+    # unpacker.decompress(data) , refusing to return more than max_size bytes. Output short of the
+    # limit means nothing is held back , so the next part can follow as usual.
+    out = unpacker.decompress(data, max_size + 1)
+    if len(out) > max_size:
+        raise ValueError(f"Payload expands to more than {max_size} bytes")
+    return out
+
+
+def choose(data, method="auto"):
+    # Returns (method , payload) , keeping the data as is when compressing does not make it smaller
+    if method == "auto":
+        if len(data) < AUTO_MIN_BYTES:
+            return "none", data
+        candidates = ["zlib"] if len(data) > AUTO_TRY_ALL_BYTES else ["zlib", "bz2", "lzma"]
+    else:
+        candidates = [method]
+
+    level = 6 if len(data) > AUTO_TRY_ALL_BYTES else 9
+    best = min(((m, compress(data, m, level)) for m in candidates), key=lambda c: len(c[1]))
+    if best[0] == "none" or len(best[1]) + EXTENDED_HEADER_BYTES >= len(data):
+        return "none", data
+    return best
@@ -1,13 +1,30 @@
+import argparse
 import sys 
 import os
+import zlib
+from collections import Counter
 from PIL import Image
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+from bitstream import CHUNK_BYTES, Bitstream
+from timing import StageTimer, format_timings
+from progress import PROGRESS_ROWS, Progress
+from header import MAX_HEADER_BITS, Header
+from layout import LEGACY_MODES, bits_per_pixel, capacity_bits, pixels_for, read_block, uses_alpha
+from plane_cache import PLANES
+from pngstream import open_image
+import compression
+
 
 def resolve_image_path(filename):
     if os.path.exists(filename):
         return filename
     name , ext = os.path.splitext(filename)
 
-    extensions = ['.png' , '.jpg' , '.jpeg' , '.bmp' , '.tiff']
+    extensions = ['.png' , '.jpg' , '.jpeg' , '.bmp' , '.tif' , '.tiff']
     for e in extensions:
         canditate = name + e 
         if os.path.exists(canditate):
@@ -15,18 +32,52 @@ def resolve_image_path(filename):
     return None
 
 
-def xor_decrypt(cipher_bytes , key):
+def xor_decrypt(cipher_bytes , key , offset = 0):
+    # offset is where cipher_bytes starts in the whole payload , for payloads decrypted in chunks
     key_bytes = key.encode("ascii")
-    decrypted = bytearray()
+    n = len(cipher_bytes)
+    if n == 0:
+        return bytearray()
+    shift = offset % len(key_bytes)
+    key_bytes = key_bytes[shift:] + key_bytes[:shift]
 
-    for i in range(len(cipher_bytes)):
-        decrypted.append(cipher_bytes[i] ^ key_bytes[i % len(key_bytes)])
+    # Tile the key across the whole buffer and XOR both as big integers in one go
+    key_stream = (key_bytes * (n // len(key_bytes) + 1))[:n]
+    decrypted = int.from_bytes(cipher_bytes , "big") ^ int.from_bytes(key_stream , "big")
 
-    return decrypted
+    return bytearray(decrypted.to_bytes(n , "big"))
 
 
-def extract_bits(image_path , mode):
-    img = Image.open(image_path).convert("RGB")
+def extract_bits(image_path , mode , timings = None , progress = None , cancel = None , progress_rows = PROGRESS_ROWS , cache = True):
+    # progress / cancel work as in embed_bits , checked every progress_rows rows.
+    # The bits are kept in PLANES , so a retry on the same unchanged image skips the extraction.
+    # cache = False neither reads nor fills PLANES , for images that are read only once.
+    timer = StageTimer(timings)
+    hooks = Progress(progress , cancel , progress_rows)
+    cache_key = PLANES.key(image_path , mode) if cache else None
+    cached = PLANES.get(cache_key)
+    if cached is not None:
+        return _cache_hit(cached , timer , hooks)
+    img = Image.open(image_path)
+    timer.mark("open")
+    img.load()
+    timer.mark("decode")
+    if mode not in LEGACY_MODES:
+        # Dense modes need the header to know where the payload layout starts
+        header , capacity = _read_header(img)
+        if header.mode != mode:
+            raise ValueError(f"This image was encoded in mode {header.mode} , not mode {mode}")
+        bits = str(_read_lsbs(img , mode , capacity , hooks , header.size))
+        timer.mark("extract")
+        timer.add("bytes_read" , os.path.getsize(image_path))
+        timer.add("pixels_touched" , img.size[0] * img.size[1])
+        timer.add("bits_extracted" , len(bits))
+        PLANES.put(cache_key , bits , len(bits))
+        timer.counters["cache"] = "miss" if cache else "off"
+        timer.finish()
+        return bits
+    img = img.convert("RGB")
+    timer.mark("convert")
     pixels = img.load()
     width , height = img.size
     
@@ -42,27 +93,476 @@ def extract_bits(image_path , mode):
                 bits += str(r % 2)
                 bits += str(g % 2)
                 bits += str(b % 2)
+        if hooks.active and y % hooks.every == hooks.every - 1:
+            hooks.update((y + 1) / height)
+    timer.mark("extract")
+    timer.add("bytes_read" , os.path.getsize(image_path))
+    timer.add("pixels_touched" , width * height)
+    timer.add("bits_extracted" , len(bits))
+    PLANES.put(cache_key , bits , len(bits))
+    timer.counters["cache"] = "miss" if cache else "off"
+    timer.finish()
     return bits 
 
 
-def decode_message(bits , key):
+def extract_message_bits(image_path , timings = None , progress = None , cancel = None , progress_rows = PROGRESS_ROWS , cache = True):
+    # Only reads the pixels the message spans instead of every pixel in the image.
+    # Cached in PLANES like extract_bits , under mode None since the mode comes from the header.
+    timer = StageTimer(timings)
+    hooks = Progress(progress , cancel , progress_rows)
+    cache_key = PLANES.key(image_path , None) if cache else None
+    cached = PLANES.get(cache_key)
+    if cached is not None:
+        return _cache_hit(cached , timer , hooks)
+    with open_image(image_path) as img: # a PNG is only inflated as far down as the message goes
+        timer.mark("open")
+        bits = _message_bits(img , timer , hooks)
+    timer.add("bytes_read" , os.path.getsize(image_path))
+    PLANES.put(cache_key , bits , len(bits.data))
+    timer.counters["cache"] = "miss" if cache else "off"
+    timer.finish()
+    return bits
+
+
+def extract_from_image(img , timings = None , progress = None , cancel = None , progress_rows = PROGRESS_ROWS):
+    # In memory version of extract_message_bits , takes a PIL image
+    timer = StageTimer(timings)
+    bits = _message_bits(img , timer , Progress(progress , cancel , progress_rows))
+    timer.finish()
+    return bits
+
+
+def _cache_hit(bits , timer , hooks):
+    timer.mark("cache")
+    timer.counters["cache"] = "hit"
+    timer.add("bits_extracted" , len(bits))
+    hooks.update(1.0)
+    timer.finish()
+    return bits
+
+
+def _message_bits(img , timer , hooks):
+    img.load()
+    timer.mark("decode")
+
+    header , capacity = _read_header(img)
+    timer.mark("header")
+
+    total_bits = min(header.size + header.length * 8 , capacity) # a garbage length cannot read past the image
+    bits = _read_lsbs(img , header.mode , total_bits , hooks , header.size)
+    timer.mark("payload")
+
+    timer.add("pixels_touched" , pixels_for(header.mode , total_bits , header.size))
+    timer.add("bits_extracted" , total_bits)
+    return bits
+
+
+def read_header(image):
+    # Just the header , enough to tell a text message from a file and to check the mode.
+    # image is a path , a file object or a PIL image.
+    if isinstance(image , Image.Image):
+        return _read_header(image)[0]
+    with open_image(image) if isinstance(image , (str , os.PathLike)) else Image.open(image) as img:
+        return _read_header(img)[0]
+
+
+def extract_file(image_path , key , output , timings = None , progress = None , cancel = None , progress_rows = PROGRESS_ROWS):
+    # Streams a file payload straight to disk , a chunk of rows at a time , so memory does not grow with the file.
+    # output is a file path or an existing directory (the file keeps its stored name there).
+    # Returns (path written , mode) , nothing is left behind on failure or cancel.
+    timer = StageTimer(timings)
+    hooks = Progress(progress , cancel , progress_rows)
+    img = Image.open(image_path)
+    timer.mark("open")
+    img.load()
+    timer.mark("decode")
+
+    header , _ = _file_header(img)
+    if os.path.isdir(output):
+        # Never trust a stored path , only its last component is used
+        name = os.path.basename(header.filename.replace("\\" , "/"))
+        output = os.path.join(output , name if name not in ("" , "." , "..") else "payload.bin")
+    part_path = output + ".part"
+    try:
+        with open(part_path , "wb") as out:
+            _extract_file(img , key , out , timer , hooks)
+        hooks.update(1.0)
+        os.replace(part_path , output)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    timer.add("bytes_read" , os.path.getsize(image_path))
+    timer.finish()
+    return output , header.mode
+
+
+def extract_file_from_image(img , key , out , timings = None , progress = None , cancel = None , progress_rows = PROGRESS_ROWS ,
+                            max_size = None):
+    # In memory version of extract_file: writes the payload of a PIL image to out (any binary file object ,
+    # e.g. io.BytesIO) and returns the header , which has the stored file name and size.
+    # max_size: refuse files larger than this , however small their compressed form
+    timer = StageTimer(timings)
+    img.load()
+    timer.mark("decode")
+    header = _extract_file(img , key , out , timer , Progress(progress , cancel , progress_rows) , max_size)
+    timer.finish()
+    return header
+
+
+def _file_header(img):
+    # The header of a file payload and its size in bits , refusing text messages and shards
+    header , capacity = _read_header(img)
+    if header.shard is not None:
+        raise ValueError(f"This image holds shard {header.shard[1] + 1} of {header.shard[2]} , join the whole set with shard.py")
+    if header.filename is None:
+        raise ValueError("This image holds a text message , not a file")
+    total_bits = header.size + header.length * 8
+    if total_bits > capacity:
+        raise ValueError("Length in header is larger than the image can hold")
+    return header , total_bits
+
+
+def _extract_file(img , key , out , timer , hooks , max_size = None):
+    header , total_bits = _file_header(img)
+    if max_size is not None and header.file_size > max_size:
+        raise ValueError(f"The hidden file is {header.file_size} bytes , more than {max_size}")
+    timer.mark("header")
+    written = _write_file_payload(out , img , header , key , total_bits , hooks , max_size)
+    timer.mark("payload")
+    if written != header.file_size:
+        raise ValueError(f"Recovered {written} bytes but the header says {header.file_size} , wrong key or damaged image")
+
+    timer.add("pixels_touched" , pixels_for(header.mode , total_bits , header.size))
+    timer.add("bits_extracted" , total_bits)
+    timer.add("bytes_written" , written)
+    timer.counters["compression"] = header.compression
+    return header
+
+
+def _write_file_payload(out , img , header , key , total_bits , hooks , max_size = None):
+    # Decrypts (and decompresses) the payload chunk by chunk into out , returns the bytes written
+    unpacker = compression.decompressor(header.compression) if header.compression != "none" else None
+    written = 0
+    offset = 0
+    crc = 0
+    try:
+        for chunk in _iter_payload_bytes(img , header.mode , header.size , total_bits , hooks):
+            data = xor_decrypt(chunk , key , offset)
+            offset += len(chunk)
+            if header.checksum is not None:
+                crc = zlib.crc32(data , crc)
+            if unpacker is not None and max_size is not None:
+                data = compression.decompress_part(unpacker , data , max_size - written)
+            elif unpacker is not None:
+                data = unpacker.decompress(data)
+            out.write(data)
+            written += len(data)
+        if unpacker is not None and hasattr(unpacker , "flush"):
+            data = unpacker.flush()
+            out.write(data)
+            written += len(data)
+    except compression.ERRORS as e:
+        if isinstance(e , OSError) and unpacker is None:
+            raise # a write error , not a damaged stream
+        raise ValueError(f"Could not unpack the hidden file , wrong key or damaged image ({e})")
+    if header.checksum is not None and crc != header.checksum:
+        # Streamed , so only known at the end , the caller removes what was written
+        raise ValueError("Checksum does not match , wrong key or damaged image")
+    return written
+
+
+def _check_checksum(data , header):
+    # Right after XOR , before anything is decompressed or decoded as text
+    if header.checksum is not None and zlib.crc32(data) != header.checksum:
+        raise ValueError("Checksum does not match , wrong key or damaged image")
+
+
+def _read_header(img):
+    # Returns (header , capacity in bits for the header's mode)
+    width , height = img.size
+
+    # The mode bit is the red LSB of the first pixel in every layout , dense modes write their header as mode 3
+    mode = 1 if _read_lsbs(img , 1 , 1).read_int(0 , 1) == 0 else 3
+
+    header = Header.parse(_read_lsbs(img , mode , min(MAX_HEADER_BITS , width * height * mode)))
+    return header , capacity_bits(header.mode , width * height , header.size)
+
+
+def _iter_payload_bytes(img , mode , start , total_bits , hooks):
+    # Bits [start , total_bits) packed into bytes , one chunk per stripe of rows
+    width = img.size[0]
+    step = max(1 , CHUNK_BYTES * 8 // (width * bits_per_pixel(mode)))
+    if hooks.active:
+        step = min(step , hooks.every)
+
+    leftover = None
+    skip = start
+    for bits in _iter_lsbs(img , mode , total_bits , step , hooks , start):
+        if skip:
+            cut = min(skip , len(bits))
+            bits , skip = bits[cut:] , skip - cut
+        if leftover is not None and len(leftover):
+            bits = np.concatenate([leftover , bits]) if HAS_NUMPY else leftover + bits
+        whole = len(bits) - len(bits) % 8
+        leftover = bits[whole:]
+        if whole:
+            packed = Bitstream.from_array(bits[:whole]) if HAS_NUMPY else Bitstream.from_string(bits[:whole])
+            yield packed.data
+
+
+def _read_lsbs(img , mode , n_bits , hooks = None , header_bits = 0):
+    # Crops to the rows holding the first n_bits before converting so only those pixels are touched
+    # and returns their LSBs as a packed Bitstream. header_bits is only needed for the dense modes.
+    step = hooks.every if hooks is not None and hooks.active else max(img.size[1] , 1)
+    parts = list(_iter_lsbs(img , mode , n_bits , step , hooks , header_bits))
+
+    if HAS_NUMPY:
+        lsbs = np.concatenate(parts) if parts else np.zeros(0 , dtype = np.uint8)
+        return Bitstream.from_array(lsbs)
+    return Bitstream.from_string("".join(parts))
+
+
+def _iter_lsbs(img , mode , n_bits , step , hooks = None , header_bits = 0):
+    # LSBs of the first n_bits , step rows at a time , as a 0/1 NumPy array (a '0'/'1' str without NumPy)
+    width , height = img.size
+    n_pixels = pixels_for(mode , n_bits , header_bits)
+    rows = min(height , -(-n_pixels // width))
+
+    remaining = n_bits
+    for top in range(0 , rows , step):
+        bottom = min(rows , top + step)
+        region = img.crop((0 , top , width , bottom)).convert("RGBA" if uses_alpha(mode) else "RGB")
+
+        if mode not in LEGACY_MODES:
+            bpp = len(region.getbands())
+            px = np.asarray(region , dtype = np.uint8).reshape(-1 , bpp) if HAS_NUMPY else region.tobytes()
+            bits = read_block(px , bpp , top * width , mode , header_bits , n_bits)
+        elif HAS_NUMPY:
+            flat = np.asarray(region , dtype = np.uint8).reshape(-1)
+            bits = flat[0::3] & 1 if mode == 1 else flat & 1
+        else:
+            parts = []
+            pixels = region.load()
+            for y in range(bottom - top):
+                for x in range(width):
+                    r , g , b = pixels[x,y]
+                    if mode == 1:
+                        parts.append(str(r % 2))
+                    else:
+                        parts.append(str(r % 2))
+                        parts.append(str(g % 2))
+                        parts.append(str(b % 2))
+            bits = "".join(parts)
+
+        bits = bits[:remaining]
+        remaining -= len(bits)
+        yield bits
+
+        if hooks is not None and hooks.active:
+            hooks.update(bottom / rows)
+
+
+def decode_message(bits , key , timings = None , max_size = None):
+    # Accepts a packed Bitstream or the legacy '0'/'1' string.
+    # max_size: refuse a compressed message that expands past this many bytes
+    timer = StageTimer(timings)
+    if isinstance(bits , str):
+        bits = Bitstream.from_string(bits)
+
     # Read header 
-    mode_bit = bits[0]
-    L = int(bits[1:33] , 2)
-    actual_mode = 1 if mode_bit == "0" else 3
+    header = Header.parse(bits)
+    actual_mode = header.mode
+    if header.shard is not None:
+        raise ValueError(f"This image holds shard {header.shard[1] + 1} of {header.shard[2]} , join the whole set with shard.py")
+    if header.filename is not None:
+        raise ValueError("This image holds a file , use extract_file to save it")
 
     #Read encrypted payload  only encrypted the message party of bit stream
-    payload_bits = bits[33: 33 + (L * 8 )]
-    encrypted_bytes = bytearray()
-
-    for i in range(0 , len(payload_bits) , 8):
-        encrypted_bytes.append(int(payload_bits[i:i+8] , 2))
+    encrypted_bytes = bits.read_bytes(header.size , header.length)
+    timer.mark("unpack")
     
     #Decrypt
     message_bytes = xor_decrypt(encrypted_bytes , key)
-    return message_bytes.decode("ascii"), actual_mode
+    timer.mark("xor")
+    _check_checksum(message_bytes , header)
+    timer.mark("checksum")
+    if header.compression != "none":
+        message_bytes = compression.decompress(message_bytes , header.compression , max_size)
+    timer.mark("decompress")
+    message = message_bytes.decode("ascii")
+    timer.mark("text")
+    timer.add("payload_bytes" , len(encrypted_bytes))
+    timer.counters["compression"] = header.compression
+    timer.counters["compression_ratio"] = round(len(message_bytes) / len(encrypted_bytes) , 3) if encrypted_bytes else 1.0
+    timer.finish()
+    return message, actual_mode
+
+
+def decode_file(bits , key , timings = None , max_size = None):
+    # decode_message for a file payload held in memory , returns (file bytes , header)
+    timer = StageTimer(timings)
+    if isinstance(bits , str):
+        bits = Bitstream.from_string(bits)
+    header = Header.parse(bits)
+    if header.shard is not None:
+        raise ValueError(f"This image holds shard {header.shard[1] + 1} of {header.shard[2]} , join the whole set with shard.py")
+    if header.filename is None:
+        raise ValueError("This image holds a text message , not a file")
+    if len(bits) < header.size + header.length * 8:
+        raise ValueError("Length in header is larger than the image can hold")
+    if max_size is not None and header.file_size > max_size:
+        raise ValueError(f"The hidden file is {header.file_size} bytes , more than {max_size}")
+
+    data = xor_decrypt(bits.read_bytes(header.size , header.length) , key)
+    timer.mark("xor")
+    _check_checksum(data , header)
+    timer.mark("checksum")
+    if header.compression != "none":
+        try:
+            data = compression.decompress(data , header.compression , max_size)
+        except compression.ERRORS as e:
+            raise ValueError(f"Could not unpack the hidden file , wrong key or damaged image ({e})")
+    timer.mark("decompress")
+    if len(data) != header.file_size:
+        raise ValueError(f"Recovered {len(data)} bytes but the header says {header.file_size} , wrong key or damaged image")
+    timer.add("payload_bytes" , header.length)
+    timer.counters["compression"] = header.compression
+    timer.finish()
+    return bytes(data) , header
+
+
+# Byte classes used to rank candidate keys: readable text , and the letters / digits / spaces
+# that make up most of it (which breaks ties between keys that all give readable bytes)
+PRINTABLE = bytes([9 , 10 , 13]) + bytes(range(32 , 127))
+WORDLIKE = b" " + bytes(range(48 , 58)) + bytes(range(65 , 91)) + bytes(range(97 , 123))
+PROBE_BYTES = 64 # decompressed first , to rule out most wrong keys of a compressed payload cheaply
+
+
+def try_keys(bits , keys , top = 10 , timings = None):
+    # Decodes one extraction with many candidate keys and returns the top best first , as
+    # {"key": ... , "score": 0..1 , "valid": decoded without error , "message": str or "data": bytes}.
+    # Every key is scored , only the top ones are fully decoded (top None: all of them).
+    # The score is the share of readable bytes in the plaintext , for an uncompressed payload it is
+    # counted for all keys at once from per column byte histograms instead of decrypting once per key.
+    # With a checksum in the header only a key that matches it is valid.
+    timer = StageTimer(timings)
+    if isinstance(bits , str):
+        bits = Bitstream.from_string(bits)
+    header = Header.parse(bits)
+    if header.shard is not None:
+        raise ValueError(f"This image holds shard {header.shard[1] + 1} of {header.shard[2]} , join the whole set with shard.py")
+    if len(bits) < header.size + header.length * 8:
+        raise ValueError("Length in header is larger than the image can hold")
+    encrypted = bits.read_bytes(header.size , header.length)
+
+    # xor_decrypt only takes ASCII keys , anything else (or an empty line) cannot be the key
+    candidates = [k for k in dict.fromkeys(keys) if k and k.isascii()]
+    timer.mark("unpack")
+
+    if header.compression == "none":
+        scores = _class_scores(encrypted , candidates)
+    else:
+        scores = [_compressed_score(encrypted , key , header) for key in candidates]
+    timer.mark("score")
+
+    ranked = sorted(range(len(candidates)) , key = lambda i: scores[i] , reverse = True)
+    if header.checksum is not None and header.compression == "none":
+        # The checksum settles it , so walk down the ranking until a key matches and move that one first
+        # (compressed payloads were already checked while scoring)
+        for position , i in enumerate(ranked):
+            if zlib.crc32(xor_decrypt(encrypted , candidates[i])) == header.checksum:
+                ranked.insert(0 , ranked.pop(position))
+                break
+        timer.mark("checksum")
+    results = []
+    for i in ranked if top is None else ranked[:top]:
+        result = {"key": candidates[i] , "score": round(scores[i][0] , 4) , "valid": False}
+        try:
+            if header.filename is None:
+                result["message"] , _ = decode_message(bits , candidates[i])
+            else:
+                result["data"] , _ = decode_file(bits , candidates[i])
+            result["valid"] = True
+        except (ValueError , *compression.ERRORS):
+            pass
+        results.append(result)
+    results.sort(key = lambda r: not r["valid"]) # stable , keeps the score order within each group
+    timer.mark("decode")
+    timer.add("keys_tried" , len(candidates))
+    timer.add("payload_bytes" , len(encrypted))
+    timer.counters["compression"] = header.compression
+    timer.finish()
+    return results
+
+
+def _class_scores(encrypted , keys):
+    # (PRINTABLE share , WORDLIKE share) of the plaintext for every key.
+    # Byte c of the payload is XORed with key byte c % len(key) , so for keys of one length L
+    # a histogram of each of the L payload columns says how many bytes of a class every key byte
+    # value gives there. A key's score is then L table lookups , whatever the payload size.
+    n = len(encrypted)
+    scores = [(1.0 , 1.0)] * len(keys)
+    if n == 0:
+        return scores
+    by_length = {}
+    for i , key in enumerate(keys):
+        by_length.setdefault(len(key) , []).append(i)
+
+    for length , members in by_length.items():
+        key_bytes = [keys[i].encode("ascii") for i in members]
+        if HAS_NUMPY:
+            data = np.frombuffer(encrypted , dtype = np.uint8)
+            counts = np.bincount(np.arange(n) % length * 256 + data , minlength = length * 256).reshape(length , 256)
+            values = np.arange(256)
+            key_matrix = np.frombuffer(b"".join(key_bytes) , dtype = np.uint8).reshape(-1 , length)
+            shares = []
+            for byte_class in (PRINTABLE , WORDLIKE):
+                member = np.zeros(256 , dtype = np.int64)
+                member[list(byte_class)] = 1
+                table = counts @ member[values[: , None] ^ values[None , :]] # [c , x]: class bytes in column c XORed with x
+                shares.append(table[np.arange(length) , key_matrix].sum(axis = 1) / n)
+            for i , printable , wordlike in zip(members , *shares):
+                scores[i] = (float(printable) , float(wordlike))
+        else:
+            tables = ([] , [])
+            for c in range(length):
+                counts = Counter(encrypted[c::length])
+                for table , byte_class in zip(tables , (PRINTABLE , WORDLIKE)):
+                    row = [0] * 256
+                    for value , count in counts.items():
+                        for b in byte_class:
+                            row[value ^ b] += count
+                    table.append(row)
+            for i , kb in zip(members , key_bytes):
+                scores[i] = tuple(sum(table[c][b] for c , b in enumerate(kb)) / n for table in tables)
+    return scores
+
+
+def _compressed_score(encrypted , key , header):
+    # A wrong key almost always breaks the stream in its first bytes , only survivors are fully unpacked
+    try:
+        compression.decompressor(header.compression).decompress(bytes(xor_decrypt(encrypted[:PROBE_BYTES] , key)))
+        packed = xor_decrypt(encrypted , key)
+        _check_checksum(packed , header)
+        plain = compression.decompress(packed , header.compression)
+    except (ValueError , *compression.ERRORS):
+        return (0.0 , 0.0)
+    if header.filename is not None:
+        return (1.0 , 1.0) if len(plain) == header.file_size else (0.0 , 0.0)
+    if not plain:
+        return (1.0 , 1.0)
+    return tuple((len(plain) - len(plain.translate(None , byte_class))) / len(plain) for byte_class in (PRINTABLE , WORDLIKE))
 
 def main():
+    parser = argparse.ArgumentParser(description = "Reveal a message hidden in an image")
+    parser.add_argument("--timings" , action = "store_true" , help = "print a per stage timing breakdown")
+    parser.add_argument("--out" , default = "." , help = "where a hidden file is saved , a directory or file path (default: .)")
+    parser.add_argument("--keys" , help = "try every key in this file (one per line) instead of asking for one , best first")
+    parser.add_argument("--top" , type = int , default = 10 , help = "with --keys , how many candidates to show (default: 10)")
+    args = parser.parse_args()
+
     print("=================Steganography Decoder ==================")
 
     raw_input = input("Enter image file path: ")
@@ -71,12 +571,73 @@ def main():
     if image_path is None:
         print("Error: Image file not found.")
         return
+
+    if args.keys:
+        with open(args.keys , encoding = "utf-8") as f:
+            keys = [line.rstrip("\r\n") for line in f]
+        extract_timings , decode_timings = {} , {}
+        try:
+            results = try_keys(extract_message_bits(image_path , timings = extract_timings) , keys , args.top , timings = decode_timings)
+        except ValueError as e:
+            print("Error:" , e)
+            return
+        if args.timings:
+            print("Extract:")
+            print(format_timings(extract_timings))
+            print("Decode:")
+            print(format_timings(decode_timings))
+        print(f"Tried {decode_timings['keys_tried']} keys , best first:")
+        for r in results:
+            if "message" in r:
+                shown = repr(r["message"][:40])
+            elif "data" in r:
+                shown = f"file , {len(r['data'])} bytes (decrypt again with this key to save it)"
+            else:
+                shown = "does not decode"
+            print(f"  {r['score']:.3f}  {r['key']!r}: {shown}")
+        return
     
     key = input("Enter decryption key: ")
-    mode = int(input("Enter mode (1 for 1-channel , 3 for 3-channel): "))
+    mode = int(input("Enter mode (1 for 1-channel , 3 for 3-channel , 4/6/8/9/12/16 for dense): "))
 
-    bits = extract_bits(image_path , 3) # mode replaced with 3 
-    message , actual_mode = decode_message(bits , key) # Decode message and get actual mode used
+    try:
+        header = read_header(image_path)
+    except ValueError as e:
+        print("Error:" , e)
+        return
+    if header.shard is not None:
+        print(f"Error: This image is shard {header.shard[1] + 1} of {header.shard[2]}. Use shard.py join with all of them.")
+        return
+    if header.filename is not None: # a hidden file , streamed to disk instead of printed
+        if mode != header.mode:
+            print("Error: Incorrect mode selected.")
+            print("This was encoded in mode " , header.mode)
+            return
+        extract_timings = {}
+        try:
+            path , _ = extract_file(image_path , key , args.out , timings = extract_timings)
+        except ValueError as e:
+            print("Error:" , e)
+            return
+        if args.timings:
+            print("Extract:")
+            print(format_timings(extract_timings))
+        print(f"Hidden File: {header.filename} ({header.file_size} bytes) saved to {path}")
+        return
+
+    extract_timings , decode_timings = {} , {}
+    try:
+        bits = extract_message_bits(image_path , timings = extract_timings) # reads the header first , the mode comes from the image
+        message , actual_mode = decode_message(bits , key , timings = decode_timings) # Decode message and get actual mode used
+    except (ValueError , *compression.ERRORS) as e:
+        # a wrong key fails the checksum , or leaves a compressed stream that does not unpack / text that is not ASCII
+        print("Error:" , e)
+        return
+    if args.timings:
+        print("Extract:")
+        print(format_timings(extract_timings))
+        print("Decode:")
+        print(format_timings(decode_timings))
 
     if mode != actual_mode:
         print("Error: Incorrect mode selected.")
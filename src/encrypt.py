@@ -1,12 +1,28 @@
+import argparse
 import sys
 from PIL import Image 
 import os
+import tempfile
+import zlib
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+from bitstream import CHUNK_BYTES, Bitstream, BitReader
+from pngstream import PngReader, PngWriter
+from timing import StageTimer, format_timings
+from progress import PROGRESS_ROWS, Progress
+from header import HEADER_BITS, Header
+from layout import LEGACY_MODES, MODES, bits_per_pixel, capacity_bits, embed_block, pixels_for, uses_alpha
+import compression
+
 def resolve_image_path(filename):
     if os.path.exists(filename):
         return filename
     name , ext = os.path.splitext(filename)
 
-    extensions = ['.png' , '.jpg' , '.jpeg' , '.bmp' , '.tiff']
+    extensions = ['.png' , '.jpg' , '.jpeg' , '.bmp' , '.tif' , '.tiff']
     for e in extensions:
         canditate = name + e 
         if os.path.exists(canditate):
@@ -14,52 +30,383 @@ def resolve_image_path(filename):
     return None
 
 
+MODE_BITS = {m: bits_per_pixel(m) for m in MODES} # bits hidden per pixel in each mode , see layout.py
+
+# Output profiles: name -> (Pillow format , file extension , save options) , all lossless
+SAVE_PROFILES = {
+    "default": ("PNG" , ".png" , {}),
+    "fast": ("PNG" , ".png" , {"compress_level": 1}),
+    "small": ("PNG" , ".png" , {"compress_level": 9 , "optimize": True}),
+    "bmp": ("BMP" , ".bmp" , {}),
+    "tiff": ("TIFF" , ".tiff" , {}),
+}
+
 
-def xor_encrypt(message_bytes , key): # Uses repeating key XOR
+def xor_encrypt(message_bytes , key , offset = 0): # Uses repeating key XOR
+    # offset is where message_bytes starts in the whole payload , so a payload can be encrypted in chunks
     key_bytes = key.encode("ascii")
-    encrypted = bytearray()
+    n = len(message_bytes)
+    if n == 0:
+        return bytearray()
+    shift = offset % len(key_bytes)
+    key_bytes = key_bytes[shift:] + key_bytes[:shift]
+
+    # Tile the key across the whole buffer and XOR both as big integers in one go
+    key_stream = (key_bytes * (n // len(key_bytes) + 1))[:n]
+    encrypted = int.from_bytes(message_bytes , "big") ^ int.from_bytes(key_stream , "big")
+
+    return bytearray(encrypted.to_bytes(n , "big"))
+
+def capacity(image_path , mode , checksum = False , compress = None , filename = None):
+    # Largest message in bytes the image can hold , Image.open only reads the header so no pixels are decoded.
+    # checksum / compress / filename are the build options , they grow the header (see header_size)
+    if mode not in MODE_BITS:
+        raise ValueError(f"Unknown mode: {mode}")
+    with Image.open(image_path) as img:
+        width , height = img.size
+    bits = header_size(mode , checksum , compress , filename)
+    return max(0 , (capacity_bits(mode , width * height , bits) - bits) // 8)
+
+
+def header_size(mode , checksum = False , compress = None , filename = None):
+    # Size of the header build_bitstream / build_file_bitstream write with these options. With compress it
+    # assumes the extended header is needed , the message then fits in at worst as many bytes as it has
+    header = Header(mode , 0 , "zlib" if compress else "none" , filename , 0 if filename is not None else None ,
+                    checksum = 0 if checksum else None)
+    return header.size
+
+
+def pixels_needed(message_length , mode , checksum = False , compress = None , filename = None):
+    bits = header_size(mode , checksum , compress , filename)
+    return pixels_for(mode , bits + message_length * 8 , bits)
+
 
-    for i in range(len(message_bytes)):
-        encrypted.append(message_bytes[i] ^ key_bytes[i % len(key_bytes)])
+def cover_modes(image_path):
+    # Every mode the cover can take , the alpha channel modes only when it already has an alpha channel
+    with Image.open(image_path) as img:
+        has_alpha = "A" in img.getbands()
+    return [m for m in MODES if has_alpha or not uses_alpha(m)]
 
-    return encrypted
 
-def build_bitstream(message , key , mode):
+def suggest_mode(image_path , message_length , modes = None , checksum = False , compress = None , filename = None ,
+                 current = None):
+    # The mode that fits the message while touching the fewest pixels , None when nothing fits.
+    # modes defaults to cover_modes. With current (a mode the message fits in) only a mode that touches
+    # fewer pixels than it is returned.
+    if modes is None:
+        modes = cover_modes(image_path)
+    fitting = [m for m in modes if capacity(image_path , m , checksum , compress , filename) >= message_length]
+    if not fitting:
+        return None
+    touches = lambda m: pixels_needed(message_length , m , checksum , compress , filename)
+    best = min(fitting , key = touches)
+    if current is not None and touches(best) >= touches(current):
+        return None
+    return best
+
+
+def build_bitstream(message , key , mode , compress = None , timings = None , checksum = False):
+    # compress: None , "auto" (picked by size) or "zlib" / "bz2" / "lzma" , applied before encryption
+    # checksum: store a CRC32 so decoders reject a wrong key without decoding the text.
+    # Either one needs the extended header , which decoders older than it cannot read.
+    timer = StageTimer(timings)
+
     #convert message into bytes 
     message_bytes = message.encode("ascii")
+    return _build(message_bytes , key , mode , compress , timer , checksum = checksum)
+
+
+def build_data_bitstream(data , key , mode , compress = None , filename = "" , timings = None , checksum = False):
+    # build_bitstream for binary data already in memory , decoded back as bytes instead of text.
+    # It is stored like a file payload , an empty filename just means "no name".
+    # bytes(5) would quietly hide five NUL bytes , so anything that is not bytes-like is refused
+    if not isinstance(data , (bytes , bytearray , memoryview)):
+        raise TypeError(f"data must be bytes-like , not {type(data).__name__}")
+    return _build(bytes(data) , key , mode , compress , StageTimer(timings) , filename , checksum)
+
+
+def _build(message_bytes , key , mode , compress , timer , filename = None , checksum = False):
+    # Compressed only when it actually makes the payload smaller , the header records the method
+    method , payload = compression.choose(message_bytes , compress) if compress else ("none" , message_bytes)
+    timer.mark("compress")
+    crc = zlib.crc32(payload) if checksum else None
 
     #Encyrpt the payload now
-    encrypted_bytes = xor_encrypt(message_bytes , key)
-
-    # Header = Message Length if 2 characters L = 2 smh
-    L = len(encrypted_bytes)
-    # header_bits = format(L , '032b') # 32 bit header
-    mode_bit = "0" if mode == 1 else "1"
-    header_bits = mode_bit + format(L , '032b')
-
-    #Payload bits
-    payload_bits = ""
-    for byte in encrypted_bytes: 
-        payload_bits += format(byte , '08b')
-    
-    #bitstream = header + payload
-    return header_bits + payload_bits
+    encrypted_bytes = xor_encrypt(payload , key)
+    timer.mark("xor")
+
+    # Header = mode + payload length (+ version / flags / file name when needed)
+    file_size = len(message_bytes) if filename is not None else None
+    header = Header(mode , len(encrypted_bytes) , method , filename , file_size , checksum = crc)
+
+    #bitstream = header + payload , packed 8 bits per byte (str() gives the old '0'/'1' form)
+    bitstream = Bitstream.concat(header.to_bitstream() , Bitstream(encrypted_bytes))
+    timer.mark("pack")
+
+    timer.add("message_bytes" , len(message_bytes))
+    timer.add("payload_bytes" , len(encrypted_bytes))
+    timer.counters["compression"] = method
+    timer.counters["compression_ratio"] = round(len(message_bytes) / len(encrypted_bytes) , 3) if encrypted_bytes else 1.0
+    timer.add("pixels_saved" , pixels_needed(len(message_bytes) , mode) - pixels_for(mode , len(bitstream) , header.size))
+    timer.finish()
+    return bitstream
+
+class FileBitstream:
+    # Header + encrypted file contents , read from disk one chunk at a time while it is embedded
+    # so memory does not grow with the file. Used in place of a Bitstream by embed_bits.
+    def __init__(self , header , source , key):
+        self.header = header
+        self.source = source # open binary file holding the (compressed) payload
+        self.key = key
+        self.length = header.size + header.length * 8
+
+    def __len__(self):
+        return self.length
+
+    def pieces(self , size = CHUNK_BYTES):
+        yield self.header.to_bitstream()
+        self.source.seek(0)
+        offset = 0
+        while offset < self.header.length:
+            chunk = self.source.read(min(size , self.header.length - offset))
+            if not chunk:
+                raise ValueError("Payload file shrank while it was being embedded")
+            yield Bitstream(xor_encrypt(chunk , self.key , offset))
+            offset += len(chunk)
+
+    def reader(self , size = CHUNK_BYTES):
+        return BitReader(self.pieces(size))
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self , *exc):
+        self.close()
+
+
+def build_file_bitstream(file_path , key , mode , compress = None , timings = None , checksum = False):
+    # File payload version of build_bitstream , the header carries the file name and size.
+    # With compress the file is compressed into a temporary file first (zlib for "auto").
+    # With checksum the payload is read one extra time for its CRC32 , before anything is embedded.
+    # Close the result (or use it in a with block) once it has been embedded.
+    timer = StageTimer(timings)
+    file_size = os.path.getsize(file_path)
+    source = open(file_path , "rb")
+    method = "none"
+
+    if compress:
+        method = "zlib" if compress == "auto" else compress
+        packed = tempfile.TemporaryFile()
+        packer = compression.compressor(method)
+        for chunk in iter(lambda: source.read(CHUNK_BYTES) , b""):
+            packed.write(packer.compress(chunk))
+        packed.write(packer.flush())
+        if compress == "auto" and packed.tell() >= file_size:
+            packed.close() # not worth it , store the file as is
+            method = "none"
+        else:
+            source.close()
+            source = packed
+    timer.mark("compress")
+
+    crc = None
+    if checksum:
+        crc = 0
+        source.seek(0)
+        for chunk in iter(lambda: source.read(CHUNK_BYTES) , b""):
+            crc = zlib.crc32(chunk , crc)
+        timer.mark("checksum")
+
+    payload_bytes = source.seek(0 , os.SEEK_END)
+    header = Header(mode , payload_bytes , method , filename = os.path.basename(file_path) , file_size = file_size ,
+                    checksum = crc)
+    bitstream = FileBitstream(header , source , key)
+
+    timer.add("message_bytes" , file_size)
+    timer.add("payload_bytes" , payload_bytes)
+    timer.counters["compression"] = method
+    timer.counters["compression_ratio"] = round(file_size / payload_bytes , 3) if payload_bytes else 1.0
+    timer.finish()
+    return bitstream
+
+def check_profile(profile , mode):
+    if profile not in SAVE_PROFILES:
+        raise ValueError(f"Unknown output profile: {profile}")
+    if uses_alpha(mode) and SAVE_PROFILES[profile][0] == "BMP":
+        # Pillow reads a 32 bit BMP back as RGB , the alpha LSBs would be lost
+        raise ValueError(f"Mode {mode} hides bits in the alpha channel , which BMP output does not keep. Use PNG or TIFF")
+
+def embed_bits(image_path , bitstream , mode , output_path , engine = "auto" , max_memory = None , profile = "default" , timings = None ,
+               progress = None , cancel = None , progress_rows = PROGRESS_ROWS):
+    # timings: optional dict (filled in) or callback (called once) with per stage seconds and counters
+    # progress: optional callback given the fraction done every progress_rows rows
+    # cancel: optional token with is_set() (e.g. threading.Event) , raises Cancelled and leaves no output file
+    check_profile(profile , mode)
+    save_format , _ , save_options = SAVE_PROFILES[profile]
+    timer = StageTimer(timings)
+    hooks = Progress(progress , cancel , progress_rows)
+    with Image.open(image_path) as img:
+        size = img.size
+    header_bits = _check_fits(size , bitstream , mode)
+
+    # Written next to the output and renamed at the end so a failed or cancelled run leaves nothing behind
+    part_path = output_path + ".part"
+    try:
+        # With max_memory (bytes) an 8 bit RGB/RGBA PNG cover is streamed in horizontal stripes
+        # instead of being decoded whole , other covers and formats fall back to the normal path below
+        streamed = False
+        if max_memory is not None and save_format == "PNG":
+            compress_level = save_options.get("compress_level" , 6)
+            streamed = _embed_png_stream(image_path , bitstream , mode , header_bits , part_path , max_memory , compress_level ,
+                                         timer , hooks)
+
+        if not streamed:
+            img = Image.open(image_path)
+            timer.mark("open")
+            img.load()
+            timer.mark("decode")
+            img = _embed_image(img , bitstream , mode , header_bits , engine , timer , hooks)
+
+            img.save(part_path , format = save_format , **save_options) # for lossless 
+            timer.mark("save")
+
+        hooks.update(1.0) # last chance to cancel before the output appears
+        os.replace(part_path , output_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    timer.add("bytes_read" , os.path.getsize(image_path))
+    timer.add("bytes_written" , os.path.getsize(output_path))
+    _count_embedded(timer , size , bitstream , mode , header_bits)
+    timer.finish()
+
+
+def embed_image(img , bitstream , mode , engine = "auto" , timings = None , progress = None , cancel = None ,
+                progress_rows = PROGRESS_ROWS):
+    # In memory version of embed_bits: takes a PIL image and returns a new one holding the bitstream ,
+    # the image passed in is left as it is. Saving is up to the caller.
+    timer = StageTimer(timings)
+    hooks = Progress(progress , cancel , progress_rows)
+    header_bits = _check_fits(img.size , bitstream , mode)
+    img.load()
+    timer.mark("decode")
+    img = _embed_image(img , bitstream , mode , header_bits , engine , timer , hooks)
+    _count_embedded(timer , img.size , bitstream , mode , header_bits)
+    timer.finish()
+    return img
 
-def embed_bits(image_path , bitstream , mode , output_path):
-    img = Image.open(image_path).convert("RGB")
+
+def _check_fits(size , bitstream , mode):
+    # Refuses oversized payloads up front instead of silently cutting them off at the last pixel ,
+    # returns the header size the layout needs
+    if mode not in MODE_BITS:
+        raise ValueError(f"Unknown mode: {mode}")
+    # Dense modes put the header in the mode 3 layout , the payload starts after it
+    header_bits = HEADER_BITS if mode in LEGACY_MODES else _dense_header_bits(bitstream , mode)
+
+    width , height = size
+    max_bytes = max(0 , (capacity_bits(mode , width * height , header_bits) - header_bits) // 8)
+    if len(bitstream) > header_bits + max_bytes * 8:
+        needed = -(-(len(bitstream) - header_bits) // 8)
+        raise ValueError(f"Message is too large for this image: {needed} bytes , the image holds {max_bytes} bytes in mode {mode}")
+    return header_bits
+
+
+def _embed_image(img , bitstream , mode , header_bits , engine , timer , hooks):
+    img = img.convert("RGBA" if uses_alpha(mode) else "RGB") # always a copy , the caller's image is not touched
+    timer.mark("convert")
+
+    # "auto" picks the NumPy engine when it is installed , both engines write the same pixels
+    if engine == "auto":
+        engine = "numpy" if HAS_NUMPY else "loop"
+
+    if engine not in ("numpy" , "loop"):
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == "numpy" and not HAS_NUMPY:
+        raise ValueError("The numpy engine needs NumPy installed")
+    if mode not in LEGACY_MODES:
+        img = _embed_dense(img , bitstream , mode , header_bits , hooks)
+    elif engine == "numpy":
+        img = _embed_numpy(img , bitstream , mode , hooks)
+    else:
+        _embed_loop(img , bitstream , mode , hooks)
+    timer.mark("embed")
+    return img
+
+
+def _count_embedded(timer , size , bitstream , mode , header_bits):
+    width , height = size
+    bits = min(len(bitstream) , capacity_bits(mode , width * height , header_bits))
+    timer.add("pixels_touched" , pixels_for(mode , bits , header_bits))
+    timer.add("bits_embedded" , bits)
+
+
+def _dense_header_bits(bitstream , mode):
+    # Size of the header at the front of a bitstream , and a check that it was built for this mode
+    if isinstance(bitstream , FileBitstream):
+        header = bitstream.header
+    else:
+        header = Header.parse(Bitstream.from_string(bitstream) if isinstance(bitstream , str) else bitstream)
+    if header.mode != mode:
+        raise ValueError(f"The bitstream was built for mode {header.mode} , not mode {mode}")
+    return header.size
+
+
+def _embed_dense(img , bitstream , mode , header_bits , hooks):
+    # Dense modes go through layout.embed_block with either engine , a stripe of rows at a time
+    width , height = img.size
+    bpp = len(img.getbands())
+    reader = _bit_reader(bitstream)
+    total_bits = len(bitstream)
+    rows = min(height , -(-pixels_for(mode , total_bits , header_bits) // width))
+    step = hooks.every if hooks.active else max(1 , CHUNK_BYTES * 8 // (width * MODE_BITS[mode]))
+
+    pixels = np.array(img , dtype = np.uint8).reshape(-1 , bpp) if HAS_NUMPY else bytearray(img.tobytes())
+    for top in range(0 , rows , step):
+        bottom = min(rows , top + step)
+        if HAS_NUMPY:
+            embed_block(pixels[top * width:bottom * width] , bpp , top * width , reader , mode , header_bits , total_bits)
+        else:
+            block = pixels[top * width * bpp:bottom * width * bpp]
+            embed_block(block , bpp , top * width , reader , mode , header_bits , total_bits)
+            pixels[top * width * bpp:bottom * width * bpp] = block
+        if hooks.active:
+            hooks.update(bottom / rows)
+
+    if HAS_NUMPY:
+        return Image.fromarray(pixels.reshape(height , width , bpp) , img.mode)
+    return Image.frombytes(img.mode , img.size , bytes(pixels))
+
+
+def _bit_reader(bitstream , size = CHUNK_BYTES):
+    # Bitstream , FileBitstream or the legacy '0'/'1' string , unpacked size bytes at a time
+    if isinstance(bitstream , str):
+        bitstream = Bitstream.from_string(bitstream)
+    return bitstream.reader(size)
+
+
+def _embed_loop(img , bitstream , mode , hooks):
+    reader = _bit_reader(bitstream)
     pixels = img.load()
     width , height = img.size
 
     bit_index = 0
     total_bits = len(bitstream)
     for y in range(height):
+        row_bits = reader.take(width * MODE_BITS.get(mode , 0)) # this row's bits , indexed from row_start
+        row_start = bit_index
         for x in range(width):
             if bit_index >= total_bits:
                 break 
             r , g , b = pixels[x,y]
 
             if mode == 1: # 1 channel steganography taking only red for 1 option 
-                bit = int(bitstream[bit_index])
+                bit = int(row_bits[bit_index - row_start])
                 if r % 2 != bit:
                     r -= 1 if r > 0 else r + 1
                 pixels[x,y] = (r, g, b)
@@ -71,7 +418,7 @@ def embed_bits(image_path , bitstream , mode , output_path):
                 for i in range(3):
                     if bit_index >= total_bits:
                         break
-                    bit = int(bitstream[bit_index])
+                    bit = int(row_bits[bit_index - row_start])
 
                     if channels[i] % 2 != bit: 
                         channels[i] -= 1 if channels[i] > 0 else channels[i] + 1
@@ -83,11 +430,167 @@ def embed_bits(image_path , bitstream , mode , output_path):
 
         if bit_index >= total_bits:
                 break
-        
-    img.save(output_path , format = "PNG") # for lossless 
+        if hooks.active and y % hooks.every == hooks.every - 1:
+            hooks.update(bit_index / total_bits)
+
+
+def _embed_numpy(img , bitstream , mode , hooks):
+    arr = np.array(img , dtype = np.uint8)
+    flat = arr.reshape(-1) # r , g , b of every pixel in row order , same walk as the loop
+
+    reader = _bit_reader(bitstream)
+
+    if mode == 1:
+        channel = flat[0::3] # red only
+    elif mode == 3:
+        channel = flat
+    else:
+        return img # the loop leaves the image untouched for unknown modes
+
+    n = min(len(bitstream) , len(channel)) # anything past the last pixel is dropped like the loop does
+    # One masked operation per CHUNK_BYTES of payload , or per progress_rows rows when someone is watching
+    step = hooks.every * (len(channel) // img.size[1]) if hooks.active else CHUNK_BYTES * 8
+    for start in range(0 , n , step):
+        end = min(n , start + step)
+        _set_lsb(channel[start:end] , reader.take(end - start))
+        if hooks.active:
+            hooks.update(end / n)
+    return Image.fromarray(arr , "RGB")
+
+
+def _embed_png_stream(image_path , bitstream , mode , header_bits , output_path , max_memory , compress_level , timer , hooks):
+    try:
+        reader = PngReader(image_path)
+    except ValueError:
+        return False # not a PNG
+    with reader:
+        if not reader.is_truecolor8() or (uses_alpha(mode) and reader.bpp != 4):
+            return False
+
+        width , height , row_bytes = reader.width , reader.height , reader.row_bytes
+        total_bits = min(len(bitstream) , capacity_bits(mode , width * height , header_bits))
+        payload_rows = -(-pixels_for(mode , total_bits , header_bits) // width)
+        # Each stripe row costs its bytes twice (the row and the copy NumPy makes of it) plus its bits unpacked
+        # one byte each , three times over (the bits , the buffer they are cut from and the dense modes' padded copy).
+        # Stripes get half the budget. The bit reader's pieces are unpacked eight times over and copied again as
+        # they are joined , so a sixty fourth of the budget per piece leaves room for zlib.
+        row_cost = row_bytes * 2 + width * bits_per_pixel(mode) * 3
+        stripe_rows = max(1 , max_memory // 2 // row_cost)
+        bits = _bit_reader(bitstream , max(1 , max_memory // 64))
+        # Like the in memory path , only the alpha modes keep an RGBA cover's alpha channel
+        strip_alpha = reader.bpp == 4 and not uses_alpha(mode)
+
+        if hooks.active:
+            stripe_rows = min(stripe_rows , hooks.every)
+        writer = PngWriter(output_path , width , height , 2 if strip_alpha else reader.color_type , compress_level)
+        timer.mark("open")
+        try:
+            y = 0
+            bit_index = 0
+            while y < payload_rows:
+                n = min(stripe_rows , payload_rows - y)
+                stripe = bytearray()
+                for _ in range(n):
+                    stripe += reader.read_row()
+                if mode in LEGACY_MODES:
+                    bit_index += _embed_stripe(stripe , reader.bpp , bits , bit_index , total_bits , mode)
+                else:
+                    px = np.frombuffer(stripe , dtype = np.uint8).reshape(-1 , reader.bpp) if HAS_NUMPY else stripe
+                    embed_block(px , reader.bpp , y * width , bits , mode , header_bits , total_bits)
+                _write_stripe(writer , stripe , n , strip_alpha)
+                y += n
+                if hooks.active:
+                    hooks.update(y / height)
+            timer.mark("embed")
+
+            while strip_alpha and y < height:
+                # The filtered rows cannot be copied through once the alpha bytes go , each one is rewritten
+                n = min(stripe_rows , height - y)
+                stripe = bytearray()
+                for _ in range(n):
+                    stripe += reader.read_row()
+                _write_stripe(writer , stripe , n , strip_alpha)
+                y += n
+                if hooks.active:
+                    hooks.update(y / height)
+
+            if y < height:
+                # The next row may be filtered against the original row above it , which just changed ,
+                # so it goes out unfiltered. Everything after it is copied through still filtered.
+                writer.write_row(reader.read_row())
+                y += 1
+                remaining = (height - y) * (row_bytes + 1)
+                chunk = max(row_bytes + 1 , max_memory // 8) # read buffer , its copy and the deflate output
+                if hooks.active:
+                    chunk = min(chunk , hooks.every * (row_bytes + 1))
+                while remaining > 0:
+                    data = reader.read_raw(min(chunk , remaining))
+                    if not data:
+                        raise ValueError("PNG image data is truncated")
+                    writer.write_raw(data)
+                    remaining -= len(data)
+                    if hooks.active:
+                        hooks.update(1 - remaining / ((row_bytes + 1) * height))
+            writer.close()
+        finally:
+            writer.file.close()
+        timer.mark("copy")
+    return True
+
+
+def _write_stripe(writer , stripe , n , strip_alpha):
+    # n unfiltered rows , without their alpha bytes when the output is RGB
+    if strip_alpha:
+        stripe = bytearray(stripe) # a NumPy view may still hold the original , which cannot shrink then
+        del stripe[3::4]
+    row_bytes = len(stripe) // n
+    for i in range(n):
+        writer.write_row(stripe[i * row_bytes:(i + 1) * row_bytes])
+
+
+def _embed_stripe(stripe , bpp , bits , start , total_bits , mode):
+    # Embeds the next bits (a BitReader at bit start) into a stripe of unfiltered rows in place ,
+    # returns how many were used
+    if HAS_NUMPY:
+        px = np.frombuffer(stripe , dtype = np.uint8).reshape(-1 , bpp)
+        channel = px[:, 0] if mode == 1 else px[:, :3].reshape(-1)
+        n = min(total_bits - start , len(channel))
+        _set_lsb(channel[:n] , bits.take(n))
+        if mode == 3:
+            px[:, :3] = channel.reshape(-1 , 3) # reshape copies when there is an alpha channel
+        return n
+
+    channels = (0 ,) if mode == 1 else (0 , 1 , 2)
+    n = min(total_bits - start , len(stripe) // bpp * len(channels))
+    chunk = bits.take(n)
+    used = 0
+    for p in range(0 , len(stripe) , bpp):
+        for c in channels:
+            if used >= n:
+                return used
+            v = stripe[p + c]
+            if v % 2 != int(chunk[used]) and v > 0:
+                stripe[p + c] = v - 1
+            used += 1
+    return used
+
+
+def _set_lsb(values , bits):
+    # Same rule as the loop: a mismatched value is decremented , a 0 that should be odd
+    # goes to -1 which PIL clamps back to 0 , so it is left as is here too
+    mismatch = (values & 1) != bits
+    values[mismatch & (values > 0)] -= 1
 
 
 def main():
+    parser = argparse.ArgumentParser(description = "Hide a message in an image")
+    parser.add_argument("--timings" , action = "store_true" , help = "print a per stage timing breakdown")
+    parser.add_argument("--compress" , nargs = "?" , const = "auto" , choices = ("auto" ,) + compression.METHODS[1:] ,
+                        help = "compress the message before encrypting (default method: auto)")
+    parser.add_argument("--file" , help = "hide this file (any type) instead of a typed message")
+    parser.add_argument("--checksum" , action = "store_true" , help = "store a CRC32 so a wrong key is rejected straight away")
+    args = parser.parse_args()
+
     print("=================Steganography Encoder ==================")
 
     raw_input = input("Enter image file path: ")
@@ -96,18 +599,58 @@ def main():
     if image_path is None:
         print("Error: Image file not found.")
         return
-    message = input("Enter message to hide: ")
+    if args.file:
+        if not os.path.isfile(args.file):
+            print("Error: Payload file not found.")
+            return
+        message = None
+        message_length = os.path.getsize(args.file)
+    else:
+        message = input("Enter message to hide: ")
+        message_length = len(message)
     key = input("Enter encryption key: ")
-    mode = int(input("Enter mode (1 for 1-channel , 3 for 3-channel): "))
+    mode = int(input("Enter mode (1 for 1-channel , 3 for 3-channel , 4/6/8/9/12/16 for dense): "))
+    if mode not in MODE_BITS:
+        print("Error: Mode must be one of " + " , ".join(str(m) for m in MODE_BITS) + ".")
+        return
+    filename = os.path.basename(args.file) if args.file else None
+    max_bytes = capacity(image_path , mode , args.checksum , args.compress , filename)
+    if message_length > max_bytes and not args.compress: # a compressed message may still fit , embed_bits checks that
+        print(f"Error: Message is {message_length} bytes but this image holds {max_bytes} bytes in mode {mode}.")
+        other = suggest_mode(image_path , message_length , checksum = args.checksum , filename = filename)
+        if other is not None:
+            print(f"It fits in mode {other}.")
+        return
+
+    profile = input("Enter output profile (default , fast , small , bmp , tiff): ").strip() or "default"
+    if profile not in SAVE_PROFILES:
+        print("Error: Unknown output profile.")
+        return
 
     output_path = input("Enter output filename: ")
-    output_path += ".png"
+    output_path += SAVE_PROFILES[profile][1]
 
 
-    bitstream = build_bitstream(message , key , mode)
-    embed_bits(image_path , bitstream , mode , output_path)
+    build_timings , timings = {} , {}
+    try:
+        if args.file:
+            with build_file_bitstream(args.file , key , mode , compress = args.compress , timings = build_timings ,
+                                      checksum = args.checksum) as bitstream:
+                embed_bits(image_path , bitstream , mode , output_path , profile = profile , timings = timings)
+        else:
+            bitstream = build_bitstream(message , key , mode , compress = args.compress , timings = build_timings ,
+                                        checksum = args.checksum)
+            embed_bits(image_path , bitstream , mode , output_path , profile = profile , timings = timings)
+    except ValueError as e:
+        print("Error:" , e)
+        return
 
     print(f"Message Encoded Successfully in {output_path}")
+    if args.timings:
+        print("Build:")
+        print(format_timings(build_timings))
+        print("Embed:")
+        print(format_timings(timings))
     
 
 
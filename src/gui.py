@@ -1,14 +1,61 @@
-from encrypt import build_bitstream, embed_bits
-from decrypt import extract_bits, decode_message
+from encrypt import SAVE_PROFILES, build_bitstream, capacity, embed_bits, pixels_needed, suggest_mode
+from layout import LEGACY_MODES
+from decrypt import extract_message_bits, decode_message
+from timing import format_timings
+from plane_cache import PLANES
+from batch_encrypt import check_outputs, run_batch
 
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox, scrolledtext, ttk
 try:
     from tkinterdnd2 import DND_FILES, TkinterDnD
     HAS_DND = True
 except ImportError:
     HAS_DND = False
+import multiprocessing
 import os
+import queue
+import threading
+
+# Menu labels for the dense modes (see layout.py) , 1 and 3 have their own buttons
+DENSE_MODES = {
+    4: "RGBA , 1 bit each (4 bits/pixel)",
+    6: "RGB , 2 bits each (6 bits/pixel)",
+    8: "RGBA , 2 bits each (8 bits/pixel)",
+    9: "RGB , 3 bits each (9 bits/pixel)",
+    12: "RGB , 4 bits each (12 bits/pixel)",
+    16: "RGBA , 4 bits each (16 bits/pixel)",
+}
+
+
+def mode_name(mode):
+    return f"{mode}-channel" if mode in (1, 3) else f"dense {mode}-bit"
+
+
+class BackgroundJob:
+    # Runs work(job) on a worker thread , the Tk side polls results with after()
+    # since Tk widgets must only be touched from the main thread
+    def __init__(self, work):
+        self.cancelled = threading.Event()  # also passed to the core functions as their cancel token
+        self.fraction = 0.0  # written by the worker's progress callback , read by the poll
+        self.updates = queue.Queue()  # intermediate results , e.g. one per finished queue item
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self._run, args=(work,), daemon=True)
+
+    def _run(self, work):
+        try:
+            self.results.put(("ok", work(self)))
+        except Exception as e:
+            self.results.put(("error", e))
+
+    def start(self):
+        self.thread.start()
+
+    def set_progress(self, fraction):
+        self.fraction = fraction
+
+    def post(self, update):
+        self.updates.put(update)
 
 
 class RoundedButton(tk.Canvas):
@@ -115,6 +162,8 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
         self.configure(bg=self.background)
         self.sidebar_width = 200
         self.sidebar_visible = True
+        self.jobs = {"encrypt": None, "decrypt": None}
+        self.progress = {}
 
         self.build_layout()
 
@@ -245,12 +294,21 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
         self.section(card, "Image File")
         self.drag_drop_area(card, self.encrypt_image_path, self.select_encrypt_image, "encrypt")
 
+        self.encrypt_queue = []
+        self.encrypt_queue_state = {}
+        self.encrypt_output_dir = tk.StringVar(value="")
+        self.section(card, "Batch Queue")
+        self.queue_panel(card)
+
         self.section(card, "Secret Message")
         self.encrypt_message = scrolledtext.ScrolledText(
             card, height=5, font=("Segoe UI", 11), relief="flat", bg=self.card_bg,
             fg=self.text_dark, insertbackground=self.primary, wrap="word"
         )
-        self.encrypt_message.pack(fill="both", expand=True, pady=(0, 15), ipady=8, padx=1)
+        self.encrypt_message.pack(fill="both", expand=True, pady=(0, 5), ipady=8, padx=1)
+        self.capacity_label = tk.Label(card, text="", bg=self.card_bg, fg=self.text_light, font=("Segoe UI", 10), anchor="w", justify="left")
+        self.capacity_label.pack(fill="x", pady=(0, 15))
+        self.encrypt_message.bind("<KeyRelease>", lambda e: self.update_capacity_meter())
 
         self.section(card, "Encryption Key")
         self.encrypt_key = self.rounded_entry(card, show="●")
@@ -258,10 +316,30 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
         self.section(card, "Channel Mode")
         self.encrypt_channel = tk.IntVar(value=3)
         self.channel_buttons(card, self.encrypt_channel)
+        self.encrypt_channel.trace_add("write", lambda *a: self.update_capacity_meter())
+        self.encrypt_image_path.trace_add("write", lambda *a: self.update_capacity_meter())
+
+        self.section(card, "Output Format")
+        self.encrypt_profile = tk.StringVar(value="default")
+        self.profile_menu(card, self.encrypt_profile)
+        self.encrypt_compress = tk.BooleanVar(value=False)
+        tk.Checkbutton(card, text="Compress message first (touches fewer pixels for long text)", variable=self.encrypt_compress,
+                       bg=self.card_bg, fg=self.text_dark, activebackground=self.card_bg, font=("Segoe UI", 10),
+                       cursor="hand2").pack(anchor="w", padx=10)
+        self.encrypt_checksum = tk.BooleanVar(value=False)
+        tk.Checkbutton(card, text="Add checksum (a wrong key is reported instead of showing garbage)", variable=self.encrypt_checksum,
+                       bg=self.card_bg, fg=self.text_dark, activebackground=self.card_bg, font=("Segoe UI", 10),
+                       cursor="hand2").pack(anchor="w", padx=10)
+        # Both grow the header , so less of the image is left for the message
+        self.encrypt_compress.trace_add("write", lambda *a: self.update_capacity_meter())
+        self.encrypt_checksum.trace_add("write", lambda *a: self.update_capacity_meter())
+        self.update_capacity_meter()
 
         btn_frame = tk.Frame(card, bg=self.card_bg)
         btn_frame.pack(fill="x", pady=25)
         RoundedButton(btn_frame, "Encrypt Now", self.run_encrypt, "#bbf7d0", self.text_dark, width=220, height=50, hover_color="#e9d5ff").pack()
+        self.encrypt_details = self.timings_label(card)
+        self.progress["encrypt"] = self.progress_area(card, lambda: self.cancel_job("encrypt"), self.encrypt_details)
 
     def build_decrypt_page(self):
         page = self.pages["Decrypt"]
@@ -290,6 +368,8 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
         btn_frame = tk.Frame(card, bg=self.card_bg)
         btn_frame.pack(fill="x", pady=25)
         RoundedButton(btn_frame, "Decrypt Now", self.run_decrypt, "#bbf7d0", self.text_dark, width=220, height=50, hover_color="#e9d5ff").pack()
+        self.decrypt_details = self.timings_label(card)
+        self.progress["decrypt"] = self.progress_area(card, lambda: self.cancel_job("decrypt"), self.decrypt_details)
 
     def card(self, parent):
         outer = tk.Frame(parent, bg=self.background)
@@ -311,6 +391,102 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
         
         tk.Label(label_frame, text=text, bg=section_bg, fg="white", font=("Segoe UI", 11, "bold"), anchor="w", padx=15, pady=8).pack(fill="x")
 
+    def update_capacity_meter(self):
+        # Capacity comes from the image header only , cheap enough to run on every key press
+        img = self.encrypt_image_path.get()
+        used = len(self.encrypt_message.get("1.0", "end-1c").encode("ascii", errors="replace"))
+        if not img or not os.path.exists(img):
+            self.capacity_label.config(text=f"{used} bytes , select an image to see how much fits", fg=self.text_light)
+            return
+        try:
+            mode = self.encrypt_channel.get()
+            options = (self.encrypt_checksum.get(), "auto" if self.encrypt_compress.get() else None)
+            max_bytes = capacity(img, mode, *options)
+        except Exception:
+            self.capacity_label.config(text="Could not read the image size", fg=self.primary)
+            return
+
+        percent = 100 * used / max_bytes if max_bytes else 100
+        text = f"{used:,} of {max_bytes:,} bytes used ({percent:.1f}%) in {mode_name(mode)} mode"
+        if used > max_bytes:
+            # Any mode the cover takes , dense ones included
+            best = suggest_mode(img, used, checksum=options[0], compress=options[1])
+            if best is None:
+                text += " , too long for this image in any mode"
+        else:
+            # Only 1 or 3 channel , and only when it touches fewer pixels than the selected mode
+            best = suggest_mode(img, used, LEGACY_MODES, options[0], options[1], current=mode)
+        if best is not None:
+            text += f" , suggested: {mode_name(best)} (touches {pixels_needed(used, best, *options):,} pixels instead of {pixels_needed(used, mode, *options):,})"
+        self.capacity_label.config(text=text, fg=self.primary if used > max_bytes else self.text_light)
+
+    def timings_label(self, parent):
+        # Shows the per stage breakdown of the last run
+        label = tk.Label(parent, text="", bg=self.card_bg, fg=self.text_light, font=("Consolas", 9), justify="left", anchor="w")
+        label.pack(fill="x", pady=(0, 10))
+        return label
+
+    def progress_area(self, parent, cancel_cmd, before):
+        # Progress bar and Cancel button , only packed while a job runs
+        frame = tk.Frame(parent, bg=self.card_bg)
+        bar = ttk.Progressbar(frame, mode="determinate", maximum=100, length=320)
+        bar.pack(side="left", fill="x", expand=True, padx=(10, 15))
+        RoundedButton(frame, "Cancel", cancel_cmd, "#fecaca", self.text_dark, width=120, height=40, hover_color="#e9d5ff").pack(side="left")
+        return frame, bar, before
+
+    def show_progress(self, name):
+        frame, bar, before = self.progress[name]
+        frame.pack(fill="x", pady=(0, 15), before=before)
+        bar["value"] = 0
+
+    def hide_progress(self, name):
+        frame, bar, _ = self.progress[name]
+        frame.pack_forget()
+
+    def start_job(self, name, work, on_success, on_update=None):
+        # One job per page , the window keeps handling events while it runs
+        if self.jobs[name] is not None:
+            return
+        job = BackgroundJob(work)
+        self.jobs[name] = job
+        self.show_progress(name)
+        job.start()
+        self.after(100, lambda: self.poll_job(name, job, on_success, on_update))
+
+    def poll_job(self, name, job, on_success, on_update=None):
+        while on_update is not None and not job.updates.empty():
+            on_update(job.updates.get_nowait())
+        try:
+            status, value = job.results.get_nowait()
+        except queue.Empty:
+            self.progress[name][1]["value"] = job.fraction * 100
+            self.after(100, lambda: self.poll_job(name, job, on_success, on_update))
+            return
+        while on_update is not None and not job.updates.empty():
+            on_update(job.updates.get_nowait())
+        # Only freed once the worker has returned , a cancelled one may still be cleaning up until then
+        self.jobs[name] = None
+        self.hide_progress(name)
+        if job.cancelled.is_set():
+            # run_batch has removed its .part files by now , so a new run can safely start
+            if name == "encrypt" and "working" in self.encrypt_queue_state.values():
+                for p in self.encrypt_queue:
+                    if self.encrypt_queue_state.get(p) == "working":
+                        self.set_queue_item(p, "cancelled")
+                self.finish_queue()
+            return
+        if status == "ok":
+            on_success(value)
+        else:
+            messagebox.showerror("Error", str(value))
+
+    def cancel_job(self, name):
+        # The page stays busy until poll_job sees the worker return
+        job = self.jobs[name]
+        if job is None or job.cancelled.is_set():
+            return
+        job.cancelled.set()
+
     def rounded_entry(self, parent, **kwargs):
         entry_frame = tk.Frame(parent, bg=self.border_color, highlightthickness=0)
         entry_frame.pack(fill="x", pady=(0, 15), ipady=2, ipadx=2)
@@ -364,7 +540,7 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
         
         if HAS_DND:
             area.drop_target_register(DND_FILES)
-            area.dnd_bind('<<Drop>>', lambda e: self.handle_drop(e, var))
+            area.dnd_bind('<<Drop>>', lambda e: self.handle_drop(e, var, mode))
             
             def on_drag_enter(e):
                 area.config(bg="#ffe4e6")
@@ -376,14 +552,82 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
             area.dnd_bind('<<DragEnter>>', on_drag_enter)
             area.dnd_bind('<<DragLeave>>', on_drag_leave)
 
-    def handle_drop(self, event, var):
-        files = self.tk.splitlist(event.data)
-        if files:
-            file_path = files[0].strip('{}')
-            if file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
-                var.set(file_path)
-            else:
-                messagebox.showerror("Error", "Please drop an image file (PNG, JPG, BMP)")
+    def handle_drop(self, event, var, mode):
+        files = [f.strip('{}') for f in self.tk.splitlist(event.data)]
+        images = [f for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff'))]
+        if not images:
+            if files:
+                messagebox.showerror("Error", "Please drop an image file (PNG, JPG, BMP, TIFF)")
+            return
+        if mode == "encrypt":
+            self.add_to_queue(images)  # every dropped cover is queued
+        else:
+            var.set(images[0])
+
+    def queue_panel(self, parent):
+        self.queue_list = tk.Listbox(parent, height=6, font=("Consolas", 10), relief="flat", bg=self.background,
+                                     fg=self.text_dark, highlightthickness=1, highlightbackground=self.border_color)
+        self.queue_list.pack(fill="x", pady=(0, 10))
+        self.queue_list.insert("end", "Drop or browse several images to encrypt them all at once")
+
+        row = tk.Frame(parent, bg=self.card_bg)
+        row.pack(fill="x", pady=(0, 10))
+        RoundedButton(row, "Output Folder", self.select_output_dir, self.primary, "white", width=150, height=40, hover_color=self.secondary).pack(side="left", padx=(0, 10))
+        RoundedButton(row, "Clear Queue", self.clear_queue, self.border_color, self.text_dark, width=150, height=40, hover_color="#e9d5ff").pack(side="left")
+
+        self.queue_status = tk.Label(parent, text="", bg=self.card_bg, fg=self.text_light, font=("Segoe UI", 10), anchor="w", justify="left")
+        self.queue_status.pack(fill="x")
+        self.encrypt_output_dir.trace_add("write", lambda *a: self.update_queue_status())
+
+    def add_to_queue(self, paths):
+        # Several covers picked or dropped at once are queued , a single one replaces the selection and the queue
+        if self.jobs["encrypt"] is not None:
+            return
+        if len(paths) == 1:
+            self.clear_queue()
+            self.encrypt_image_path.set(paths[0])
+            return
+        for p in paths:
+            if p not in self.encrypt_queue:
+                self.encrypt_queue.append(p)
+        self.encrypt_image_path.set(paths[-1])
+        self.queue_list.delete(0, "end")
+        for p in self.encrypt_queue:
+            self.queue_list.insert("end", f"{'waiting':<10} {os.path.basename(p)}")
+        self.update_queue_status()
+
+    def clear_queue(self):
+        if self.jobs["encrypt"] is not None:
+            return
+        self.encrypt_queue = []
+        self.encrypt_queue_state = {}
+        self.encrypt_image_path.set("")
+        self.queue_list.delete(0, "end")
+        self.update_queue_status()
+
+    def finish_queue(self):
+        # After a run the list keeps showing how each image went , but the next pick starts a new queue
+        self.encrypt_queue = []
+        self.encrypt_queue_state = {}
+        self.encrypt_image_path.set("")
+
+    def select_output_dir(self):
+        d = filedialog.askdirectory()
+        if d:
+            self.encrypt_output_dir.set(d)
+
+    def update_queue_status(self, text=None):
+        if text is None:
+            folder = self.encrypt_output_dir.get() or "not chosen"
+            text = f"{len(self.encrypt_queue)} image(s) queued , output folder: {folder}"
+        self.queue_status.config(text=text)
+
+    def set_queue_item(self, path, status):
+        self.encrypt_queue_state[path] = status
+        if path in self.encrypt_queue:
+            i = self.encrypt_queue.index(path)
+            self.queue_list.delete(i)
+            self.queue_list.insert(i, f"{status:<10} {os.path.basename(path)}")
 
     def channel_buttons(self, parent, var):
         row = tk.Frame(parent, bg=self.card_bg)
@@ -402,11 +646,16 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
                 btn1_canvas.itemconfig(txt1, fill=self.text_dark)
                 btn3_canvas.itemconfig(rect3, fill=self.card_bg, outline=self.border_color)
                 btn3_canvas.itemconfig(txt3, fill=self.text_light)
-            else:
+            elif m == 3:
                 btn1_canvas.itemconfig(rect1, fill=self.card_bg, outline=self.border_color)
                 btn1_canvas.itemconfig(txt1, fill=self.text_light)
                 btn3_canvas.itemconfig(rect3, fill=light_yellow, outline=light_yellow)
                 btn3_canvas.itemconfig(txt3, fill=self.text_dark)
+            else:
+                for canvas, rect, txt in ((btn1_canvas, rect1, txt1), (btn3_canvas, rect3, txt3)):
+                    canvas.itemconfig(rect, fill=self.card_bg, outline=self.border_color)
+                    canvas.itemconfig(txt, fill=self.text_light)
+            dense.set(DENSE_MODES.get(m, "Dense mode..."))
 
         btn1_canvas = tk.Canvas(row, width=150, height=45, bg=self.card_bg, highlightthickness=0)
         btn1_canvas.pack(side="left", padx=10)
@@ -421,9 +670,34 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
         txt3 = btn3_canvas.create_text(75, 22, text="3-Channel", fill="white", font=("Segoe UI", 11, "bold"))
         btn3_canvas.bind("<Button-1>", lambda e: set_mode(3))
         btn3_canvas.configure(cursor="hand2")
+
+        # More bits per pixel for large payloads , fewer pixels touched but easier to detect
+        dense = tk.StringVar(value="Dense mode...")
+        menu = tk.OptionMenu(row, dense, *DENSE_MODES.values(),
+                             command=lambda label: set_mode({v: k for k, v in DENSE_MODES.items()}[label]))
+        menu.config(font=("Segoe UI", 10), bg=self.card_bg, fg=self.text_dark, relief="flat",
+                    highlightthickness=1, highlightbackground=self.border_color, activebackground="#e9d5ff", cursor="hand2")
+        menu["menu"].config(font=("Segoe UI", 10), bg=self.card_bg, fg=self.text_dark)
+        menu.pack(side="left", padx=10)
         
         update_buttons()
 
+    def profile_menu(self, parent, var):
+        labels = {
+            "default": "PNG (balanced)",
+            "fast": "PNG (fast save)",
+            "small": "PNG (smallest file)",
+            "bmp": "BMP (uncompressed)",
+            "tiff": "TIFF (uncompressed)",
+        }
+        display = tk.StringVar(value=labels[var.get()])
+        menu = tk.OptionMenu(parent, display, *labels.values(),
+                             command=lambda label: var.set({v: k for k, v in labels.items()}[label]))
+        menu.config(font=("Segoe UI", 11), bg=self.card_bg, fg=self.text_dark, relief="flat",
+                    highlightthickness=1, highlightbackground=self.border_color, activebackground="#e9d5ff", cursor="hand2")
+        menu["menu"].config(font=("Segoe UI", 11), bg=self.card_bg, fg=self.text_dark)
+        menu.pack(anchor="w", padx=10, pady=10)
+
     def _create_rounded_rect(self, canvas, x1, y1, x2, y2, radius=25, **kwargs):
         points = [
             x1+radius, y1, x2-radius, y1, x2, y1, x2, y1+radius,
@@ -433,16 +707,19 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
         return canvas.create_polygon(points, smooth=True, **kwargs)
 
     def select_encrypt_image(self):
-        p = filedialog.askopenfilename(filetypes=[("Images", "*.png *.jpg *.jpeg *.bmp")])
-        if p:
-            self.encrypt_image_path.set(p)
+        paths = filedialog.askopenfilenames(filetypes=[("Images", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff")])
+        if paths:
+            self.add_to_queue(list(paths))
 
     def select_decrypt_image(self):
-        p = filedialog.askopenfilename(filetypes=[("Images", "*.png *.jpg *.jpeg *.bmp")])
+        p = filedialog.askopenfilename(filetypes=[("Images", "*.png *.bmp *.tif *.tiff *.jpg *.jpeg")])
         if p:
             self.decrypt_image_path.set(p)
 
     def run_encrypt(self):
+        if len(self.encrypt_queue) > 1:
+            self.run_encrypt_queue()
+            return
         try:
             img = self.encrypt_image_path.get()
             msg = self.encrypt_message.get("1.0", "end").strip()
@@ -456,12 +733,90 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
             if not key:
                 raise ValueError("Please enter an encryption key")
 
-            out = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG Image", "*.png")])
+            profile = self.encrypt_profile.get()
+            fmt, ext, _ = SAVE_PROFILES[profile]
+            out = filedialog.asksaveasfilename(defaultextension=ext, filetypes=[(f"{fmt} Image", f"*{ext}")])
             if not out:
                 return
 
-            embed_bits(img, build_bitstream(msg, key, mode), mode, out)
-            messagebox.showinfo("Success", "Message encrypted successfully!")
+            compress = "auto" if self.encrypt_compress.get() else None
+            checksum = self.encrypt_checksum.get()
+
+            def work(job):
+                build_timings, timings = {}, {}
+                bitstream = build_bitstream(msg, key, mode, compress=compress, timings=build_timings, checksum=checksum)
+                embed_bits(img, bitstream, mode, out, profile=profile, timings=timings,
+                           progress=job.set_progress, cancel=job.cancelled)
+                return build_timings, timings
+
+            def done(result):
+                build_timings, timings = result
+                self.encrypt_details.config(text="Last run (build):\n" + format_timings(build_timings)
+                                            + "\nLast run (embed):\n" + format_timings(timings))
+                messagebox.showinfo("Success", "Message encrypted successfully!")
+
+            self.start_job("encrypt", work, done)
+
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    def run_encrypt_queue(self):
+        # Same message / key / mode into every queued cover , encoded in parallel by a process pool
+        try:
+            msg = self.encrypt_message.get("1.0", "end").strip()
+            key = self.encrypt_key.get()
+            mode = self.encrypt_channel.get()
+            profile = self.encrypt_profile.get()
+            compress = "auto" if self.encrypt_compress.get() else None
+            checksum = self.encrypt_checksum.get()
+
+            if not msg:
+                raise ValueError("Please enter a message")
+            if not key:
+                raise ValueError("Please enter an encryption key")
+            if not self.encrypt_output_dir.get():
+                self.select_output_dir()
+            out_dir = self.encrypt_output_dir.get()
+            if not out_dir:
+                return
+
+            ext = SAVE_PROFILES[profile][1]
+            jobs = [(p, msg, key, mode, os.path.join(out_dir, os.path.splitext(os.path.basename(p))[0] + ext))
+                    for p in self.encrypt_queue]
+            check_outputs(jobs)
+            for p in self.encrypt_queue:
+                self.set_queue_item(p, "working")
+
+            def work(job):
+                finished = []
+
+                def on_result(result):
+                    finished.append(result)
+                    job.set_progress(len(finished) / len(jobs))
+                    job.post(result)
+
+                _, summary = run_batch(jobs, report=lambda line: None, profile=profile,
+                                       on_result=on_result, cancel=job.cancelled, compress=compress,
+                                       checksum=checksum)
+                return summary
+
+            def update(result):
+                self.set_queue_item(result["image"], "done" if result["ok"] else "failed")
+                if not result["ok"]:
+                    self.update_queue_status(f"{os.path.basename(result['image'])}: {result['error']}")
+
+            def done(summary):
+                self.finish_queue()
+                self.update_queue_status(
+                    f"{summary['succeeded']} encrypted , {summary['failed']} failed in {summary['seconds']:.1f}s "
+                    f"({summary['images_per_second']:.2f} images/s , {summary['megapixels_per_second']:.2f} MP/s)"
+                )
+                if summary["failed"]:
+                    messagebox.showwarning("Finished", f"{summary['failed']} image(s) could not be encrypted.")
+                else:
+                    messagebox.showinfo("Success", f"Encrypted {summary['succeeded']} images into {out_dir}")
+
+            self.start_job("encrypt", work, done, update)
 
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -476,17 +831,30 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
             if not key:
                 raise ValueError("Please enter the decryption key")
 
-            bits = extract_bits(img, 3)
-            msg, actual_mode = decode_message(bits, key)
+            def work(job):
+                extract_timings, decode_timings = {}, {}
+                bits = extract_message_bits(img, timings=extract_timings, progress=job.set_progress, cancel=job.cancelled)
+                msg, actual_mode = decode_message(bits, key, timings=decode_timings)
+                return msg, actual_mode, extract_timings, decode_timings
 
-            sel_mode = self.decrypt_channel.get()
-            if sel_mode != actual_mode:
-                messagebox.showwarning(
-                    "Mode Mismatch",
-                    f"Image was encoded in {actual_mode}-channel mode, not {sel_mode}-channel.\nShowing decoded message anyway."
-                )
+            def done(result):
+                msg, actual_mode, extract_timings, decode_timings = result
+                cache = PLANES.stats()
+                self.decrypt_details.config(text="Last run (extract):\n" + format_timings(extract_timings)
+                                            + "\nLast run (decode):\n" + format_timings(decode_timings)
+                                            + f"\nPlane cache: {cache['hits']} hits, {cache['misses']} misses, "
+                                            f"{cache['entries']} images, {cache['bytes'] / 2**20:.1f} MB")
+
+                sel_mode = self.decrypt_channel.get()
+                if sel_mode != actual_mode:
+                    messagebox.showwarning(
+                        "Mode Mismatch",
+                        f"Image was encoded in {mode_name(actual_mode)} mode, not {mode_name(sel_mode)}.\nShowing decoded message anyway."
+                    )
+
+                messagebox.showinfo("Decrypted Message", msg)
 
-            messagebox.showinfo("Decrypted Message", msg)
+            self.start_job("decrypt", work, done)
 
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -507,4 +875,5 @@ class StegoApp(TkinterDnD.Tk if HAS_DND else tk.Tk):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # the queue uses a process pool , needed in the packaged exe
     StegoApp().mainloop()
@@ -0,0 +1,173 @@
+from bitstream import Bitstream
+from compression import METHODS
+from layout import LEGACY_MODES, MODES
+
+HEADER_BITS = 33  # legacy header: 1 mode bit + 32 bit length
+EXTENDED_FLAG = 1 << 31  # top bit of the length field marks an extended header
+HEADER_VERSION = 1
+LAYOUT_VERSION = 2  # added the dense mode layout field
+FLAG_FILE = 1 << 2  # the payload is a file , its size and name follow
+FLAG_SHARD = 1 << 3  # the payload is one piece of a larger one , set id / index / count follow
+MAX_NAME_BYTES = 255
+FILE_BITS = 72  # original size + name length , the name follows
+SHARD_BITS = 64  # set id:32 + index:16 + count:16
+FLAG_LAYOUT = 1 << 4  # a dense mode , its channels / LSBs per channel follow
+LAYOUT_BITS = 8
+FLAG_CHECKSUM = 1 << 5  # a CRC32 of the decrypted payload follows
+CHECKSUM_BITS = 32
+CHECKSUM_VERSION = 3  # added the checksum field
+SIGNED_VERSION = 4  # added the signature , every extended header is written as this version now
+MAGIC = b"PG"
+MAGIC_BITS = 16
+PROBE_BITS = HEADER_BITS + 16 + MAGIC_BITS + LAYOUT_BITS + CHECKSUM_BITS  # everything but the file / shard fields
+MAX_HEADER_BITS = (HEADER_BITS + 16 + MAGIC_BITS + FILE_BITS + MAX_NAME_BYTES * 8 + SHARD_BITS + LAYOUT_BITS
+                   + CHECKSUM_BITS)  # the largest header , the extractor reads this much up front
+
+
+class Header:
+    # The fields in front of every payload
+    #
+    # legacy:   [mode bit][length:32]
+    # extended: [mode bit][1][length:31][version:8][flags:8]["PG":16][fields the flags ask for]
+    #   flags bits 0-1   compression method
+    #   flags bit 4      dense mode: [channels:4][LSBs per channel:4]. The header itself is
+    #                    written in the mode 3 layout (mode bit 1)
+    #   flags bit 5      checksum: [CRC32 of the payload after decrypting , before decompressing:32]
+    #   flags bit 2      file payload: [original size:64][name length:8][name:utf-8]
+    #   flags bit 3      shard: [set id:32][index:16][count:16] , last
+    # in that order , so the signature and every fixed size field sit in the first PROBE_BITS bits.
+    # Versions 1 to 3 (read only) had no signature , and the file , shard , layout and checksum
+    # fields in flag bit order.
+    #
+    # The extended form is only written when a field needs it , so plain messages stay
+    # readable by older decoders
+    def __init__(self, mode, length, compression="none", filename=None, file_size=None, shard=None, checksum=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if filename is not None and len(filename.encode("utf-8")) > MAX_NAME_BYTES:
+            raise ValueError(f"File name is longer than {MAX_NAME_BYTES} bytes")
+        self.mode = mode
+        self.length = length  # payload bytes after the header
+        self.compression = compression
+        self.filename = filename  # set for file payloads only
+        self.file_size = file_size  # size of the file before compression
+        self.shard = shard  # (set id , index , count) when the payload is split across images
+        self.checksum = checksum  # CRC32 a decoder checks right after XOR , so a wrong key fails fast
+        self.version = SIGNED_VERSION  # what an extended header was read as , new ones are always written as this
+
+    @property
+    def extended(self):
+        return (self.compression != "none" or self.filename is not None or self.shard is not None
+                or self.mode not in LEGACY_MODES or self.checksum is not None)
+
+    @property
+    def size(self):
+        if not self.extended:
+            return HEADER_BITS
+        size = HEADER_BITS + 16
+        if self.version >= SIGNED_VERSION:
+            size += MAGIC_BITS
+        if self.filename is not None:
+            size += FILE_BITS + len(self.filename.encode("utf-8")) * 8
+        if self.shard is not None:
+            size += SHARD_BITS
+        if self.mode not in LEGACY_MODES:
+            size += LAYOUT_BITS
+        if self.checksum is not None:
+            size += CHECKSUM_BITS
+        return size
+
+    def to_bitstream(self):
+        mode_bit = 0 if self.mode == 1 else 1
+        if not self.extended:
+            return Bitstream.from_int((mode_bit << 32) | self.length, HEADER_BITS)
+        if self.length >= EXTENDED_FLAG:
+            raise ValueError("Payload is too large for the header")
+        if self.version != SIGNED_VERSION:
+            raise ValueError(f"Header version {self.version} is read only")
+        flags = METHODS.index(self.compression)
+        if self.filename is not None:
+            flags |= FLAG_FILE
+        if self.shard is not None:
+            flags |= FLAG_SHARD
+        if self.mode not in LEGACY_MODES:
+            flags |= FLAG_LAYOUT
+        if self.checksum is not None:
+            flags |= FLAG_CHECKSUM
+        value = (mode_bit << 32) | EXTENDED_FLAG | self.length
+        value = (value << 16) | (SIGNED_VERSION << 8) | flags
+        fields = [Bitstream.from_int(value, HEADER_BITS + 16), Bitstream(MAGIC)]
+
+        if self.mode not in LEGACY_MODES:
+            channels, lsbs = MODES[self.mode]
+            fields.append(Bitstream.from_int((channels << 4) | lsbs, LAYOUT_BITS))
+        if self.checksum is not None:
+            fields.append(Bitstream.from_int(self.checksum, CHECKSUM_BITS))
+        if self.filename is not None:
+            name = self.filename.encode("utf-8")
+            fields.append(Bitstream.from_int((self.file_size << 8) | len(name), FILE_BITS))
+            fields.append(Bitstream(name))
+        if self.shard is not None:
+            set_id, index, count = self.shard
+            if not (0 <= set_id < 1 << 32 and 0 <= index < 1 << 16 and 0 <= count < 1 << 16):
+                raise ValueError(f"Shard set id {set_id} , index {index} or count {count} does not fit the header")
+            fields.append(Bitstream.from_int((set_id << 32) | (index << 16) | count, SHARD_BITS))
+        return Bitstream.concat(*fields)
+
+    @classmethod
+    def parse(cls, bits):
+        # bits is a Bitstream starting at the first header bit
+        mode = 1 if bits.read_int(0, 1) == 0 else 3
+        field = bits.read_int(1, 32)
+        if not field & EXTENDED_FLAG:
+            return cls(mode, field)
+
+        version = bits.read_int(HEADER_BITS, 8)
+        if version not in (HEADER_VERSION, LAYOUT_VERSION, CHECKSUM_VERSION, SIGNED_VERSION):
+            raise ValueError(f"Unsupported header version {version}")
+        flags = bits.read_int(HEADER_BITS + 8, 8)
+        header = cls(mode, field & ~EXTENDED_FLAG, METHODS[flags & 0b11])
+        header.version = version
+        start = HEADER_BITS + 16
+        if version < SIGNED_VERSION:
+            order = (FLAG_FILE, FLAG_SHARD, FLAG_LAYOUT, FLAG_CHECKSUM)
+        else:
+            if bits.read_bytes(start, len(MAGIC)) != MAGIC:
+                raise ValueError("Header signature is missing , not a PixelGuard payload")
+            start += MAGIC_BITS
+            order = (FLAG_LAYOUT, FLAG_CHECKSUM, FLAG_FILE, FLAG_SHARD)
+        for flag in order:
+            if flags & flag:
+                start = header._read_field(flag, bits, start)
+        return header
+
+    def _read_field(self, flag, bits, start):
+        # Fills in the field flag stands for , read from bits at start , and returns where the next begins
+        if flag == FLAG_FILE:
+            self.file_size = bits.read_int(start, 64)
+            name_bytes = bits.read_int(start + 64, 8)
+            name = bits.read_bytes(start + FILE_BITS, name_bytes)
+            self.filename = name.decode("utf-8", errors="replace")
+            return start + FILE_BITS + name_bytes * 8
+        if flag == FLAG_SHARD:
+            self.shard = (bits.read_int(start, 32), bits.read_int(start + 32, 16), bits.read_int(start + 48, 16))
+            return start + SHARD_BITS
+        if flag == FLAG_LAYOUT:
+            layout = bits.read_int(start, LAYOUT_BITS)
+            modes = {v: k for k, v in MODES.items()}
+            if (layout >> 4, layout & 0xF) not in modes:
+                raise ValueError(f"Unsupported layout: {layout >> 4} channels , {layout & 0xF} LSBs")
+            self.mode = modes[(layout >> 4, layout & 0xF)]
+            return start + LAYOUT_BITS
+        self.checksum = bits.read_int(start, CHECKSUM_BITS)
+        return start + CHECKSUM_BITS
+
+    def __repr__(self):
+        text = f"Header(mode={self.mode}, length={self.length}, compression={self.compression!r}"
+        if self.filename is not None:
+            text += f", filename={self.filename!r}, file_size={self.file_size}"
+        if self.shard is not None:
+            text += f", shard={self.shard}"
+        if self.checksum is not None:
+            text += f", checksum={self.checksum:#010x}"
+        return text + ")"
@@ -0,0 +1,110 @@
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Embedding modes: mode -> (channels used , LSBs per channel). The mode number is the bits hidden per pixel.
+# 1 (red) and 3 (RGB) are the original layouts. The dense modes write their header in the mode 3
+# layout over the first pixels , so any decoder finds it , and the payload in their own layout after it.
+# Modes 4 , 8 and 16 use the alpha channel (the cover is converted to RGBA).
+MODES = {1: (1, 1), 3: (3, 1), 4: (4, 1), 6: (3, 2), 8: (4, 2), 9: (3, 3), 12: (3, 4), 16: (4, 4)}
+LEGACY_MODES = (1, 3)
+
+
+def bits_per_pixel(mode):
+    channels, lsbs = MODES[mode]
+    return channels * lsbs
+
+
+def uses_alpha(mode):
+    return MODES[mode][0] == 4
+
+
+def header_pixels(mode, header_bits):
+    # Pixels the header takes up front in a dense mode , none are set aside in the legacy modes
+    return 0 if mode in LEGACY_MODES else -(-header_bits // 3)
+
+
+def capacity_bits(mode, pixels, header_bits):
+    # Header + payload bits an image of this many pixels holds
+    if mode in LEGACY_MODES:
+        return pixels * bits_per_pixel(mode)
+    reserved = header_pixels(mode, header_bits)
+    return min(pixels * 3, header_bits) + max(0, pixels - reserved) * bits_per_pixel(mode)
+
+
+def pixels_for(mode, n_bits, header_bits):
+    # Pixels the first n_bits of a stream span
+    if mode in LEGACY_MODES:
+        return -(-n_bits // bits_per_pixel(mode))
+    if n_bits <= header_bits:
+        return -(-n_bits // 3)
+    return header_pixels(mode, header_bits) + -(-(n_bits - header_bits) // bits_per_pixel(mode))
+
+
+def _spans(p0, n, mode, header_bits, total_bits):
+    # Bit ranges of the stream that fall in pixels [p0 , p0 + n) , as
+    # ((first header pixel , last , first bit , last bit) , (first payload pixel , last , first bit , last bit))
+    reserved = header_pixels(mode, header_bits)
+    bpp = bits_per_pixel(mode)
+    h0, h1 = min(p0, reserved), min(p0 + n, reserved)
+    head = (h0, h1, min(h0 * 3, header_bits, total_bits), min(h1 * 3, header_bits, total_bits))
+    q0, q1 = max(p0, reserved), max(p0 + n, reserved)
+    body = (q0, q1, min(header_bits + (q0 - reserved) * bpp, total_bits), min(header_bits + (q1 - reserved) * bpp, total_bits))
+    return head, body
+
+
+def embed_block(px, bpp, p0, reader, mode, header_bits, total_bits):
+    # Writes the stream bits that belong to pixels [p0 , p0 + n) of a dense mode , taking them from reader.
+    # px is an (n , bpp) uint8 NumPy array , or a bytearray of n * bpp values without NumPy. Edited in place.
+    n = len(px) if HAS_NUMPY else len(px) // bpp
+    channels, lsbs = MODES[mode]
+    for (a, b, start, end), (used, k) in zip(_spans(p0, n, mode, header_bits, total_bits), ((3, 1), (channels, lsbs))):
+        if end <= start:
+            continue
+        bits = reader.take(end - start)
+        if HAS_NUMPY:
+            block = px[a - p0:b - p0, :used]
+            values = block.reshape(-1) # a copy when the block skips the alpha channel
+            count = -(-len(bits) // k)
+            if k > 1:
+                padded = np.zeros(count * k, dtype=np.uint8)
+                padded[:len(bits)] = bits
+                bits = padded.reshape(-1, k) @ (1 << np.arange(k - 1, -1, -1)).astype(np.uint8)
+            mask = np.uint8(0xFF ^ ((1 << k) - 1))
+            values[:count] = (values[:count] & mask) | bits.astype(np.uint8)
+            block[:] = values.reshape(-1, used)
+        else:
+            i = 0
+            for p in range(a - p0, b - p0):
+                for c in range(used):
+                    if i >= len(bits):
+                        break
+                    chunk = bits[i:i + k].ljust(k, "0")
+                    px[p * bpp + c] = (px[p * bpp + c] >> k << k) | int(chunk, 2)
+                    i += k
+
+
+def read_block(px, bpp, p0, mode, header_bits, total_bits):
+    # The stream bits held by pixels [p0 , p0 + n) of a dense mode , as a 0/1 NumPy array
+    # (a '0'/'1' str without NumPy). px as in embed_block.
+    n = len(px) if HAS_NUMPY else len(px) // bpp
+    channels, lsbs = MODES[mode]
+    parts = []
+    for (a, b, start, end), (used, k) in zip(_spans(p0, n, mode, header_bits, total_bits), ((3, 1), (channels, lsbs))):
+        if end <= start:
+            continue
+        if HAS_NUMPY:
+            values = px[a - p0:b - p0, :used].reshape(-1)
+            bits = (values[:, None] >> np.arange(k - 1, -1, -1, dtype=np.uint8)) & 1
+            parts.append(bits.reshape(-1)[:end - start])
+        else:
+            bits = []
+            for p in range(a - p0, b - p0):
+                for c in range(used):
+                    bits.append(format(px[p * bpp + c] & ((1 << k) - 1), f"0{k}b"))
+            parts.append("".join(bits)[:end - start])
+    if HAS_NUMPY:
+        return np.concatenate(parts).astype(np.uint8) if parts else np.zeros(0, dtype=np.uint8)
+    return "".join(parts)
@@ -0,0 +1,98 @@
+# In-memory API: covers and stego images as bytes , PIL images or NumPy arrays , nothing touches the disk
+#
+#   import pixelguard
+#   stego = pixelguard.encode(cover_bytes , "secret" , "key")       # PNG bytes
+#   pixelguard.decode(stego , "key")                                  # "secret"
+#
+# Text payloads (str) come back as str , binary payloads (bytes) and hidden files come back as bytes.
+
+import io
+import os
+
+from PIL import Image
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+import decrypt
+from decrypt import (decode_file, decode_message, extract_file_from_image, extract_from_image,
+                     extract_message_bits, read_header)
+from encrypt import SAVE_PROFILES, build_bitstream, build_data_bitstream, check_profile, embed_image
+from header import Header
+
+
+def load_image(source):
+    # bytes , a file object , a path , a PIL image or a NumPy array (height x width x 3 or 4 , uint8)
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source))
+    if HAS_NUMPY and isinstance(source, np.ndarray):
+        return Image.fromarray(source)
+    return Image.open(source)
+
+
+def encode_image(cover, payload, key, mode=3, compress=None, engine="auto", timings=None, checksum=False):
+    # Like encode , but returns the PIL image instead of encoded bytes (np.asarray() it for an array)
+    build_timings, embed_timings = {}, {}
+    if isinstance(payload, str):
+        bitstream = build_bitstream(payload, key, mode, compress=compress, timings=build_timings, checksum=checksum)
+    elif isinstance(payload, (bytes, bytearray, memoryview)):
+        bitstream = build_data_bitstream(payload, key, mode, compress=compress, timings=build_timings, checksum=checksum)
+    else:
+        raise TypeError(f"payload must be str or bytes-like , not {type(payload).__name__}")
+    img = embed_image(load_image(cover), bitstream, mode, engine=engine, timings=embed_timings)
+    if timings is not None:
+        timings.update({"build": build_timings, "embed": embed_timings})
+    return img
+
+
+def encode(cover, payload, key, mode=3, profile="default", compress=None, engine="auto", timings=None, checksum=False):
+    # Hides payload (str or bytes) in cover and returns the stego image encoded in the profile's format
+    check_profile(profile, mode)
+    save_format, _, save_options = SAVE_PROFILES[profile]
+    img = encode_image(cover, payload, key, mode, compress, engine, timings, checksum)
+    buffer = io.BytesIO()
+    img.save(buffer, format=save_format, **save_options)
+    return buffer.getvalue()
+
+
+def decode(stego, key, timings=None, max_size=None):
+    # The hidden payload: str for a text message , bytes for binary data or a hidden file.
+    # A path goes through the plane cache , so decoding it again with another key skips the extraction.
+    # max_size: refuse payloads that decompress to more than this many bytes
+    extract_timings, decode_timings = {}, {}
+    if isinstance(stego, (str, os.PathLike)):
+        bits = extract_message_bits(stego, timings=extract_timings)
+        if Header.parse(bits).filename is not None:
+            payload, _ = decode_file(bits, key, timings=decode_timings, max_size=max_size)
+        else:
+            payload, _ = decode_message(bits, key, timings=decode_timings, max_size=max_size)
+    else:
+        img = load_image(stego)
+        header = read_header(img)
+        if header.filename is not None and header.shard is None:
+            out = io.BytesIO()
+            extract_file_from_image(img, key, out, timings=extract_timings, max_size=max_size)
+            payload = out.getvalue()
+        else:
+            payload, _ = decode_message(extract_from_image(img, timings=extract_timings), key, timings=decode_timings,
+                                        max_size=max_size)
+    if timings is not None:
+        timings.update({"extract": extract_timings, "decode": decode_timings})
+    return payload
+
+
+def try_keys(stego, keys, top=10, timings=None):
+    # Extracts once and ranks the candidate keys , see decrypt.try_keys for the result format
+    extract_timings, decode_timings = {}, {}
+    if isinstance(stego, (str, os.PathLike)):
+        bits = extract_message_bits(stego, timings=extract_timings)
+    else:
+        bits = extract_from_image(load_image(stego), timings=extract_timings)
+    results = decrypt.try_keys(bits, keys, top, timings=decode_timings)
+    if timings is not None:
+        timings.update({"extract": extract_timings, "decode": decode_timings})
+    return results
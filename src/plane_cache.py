@@ -0,0 +1,69 @@
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class PlaneCache:
+    # LRU cache of extracted LSB planes , so trying another key on the same image skips
+    # opening , decoding and converting it again. Entries are keyed by (path , size , mtime , mode) ,
+    # so an image that is rewritten in place is read again. Holds at most max_bytes of planes.
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (plane , size in bytes) , oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()  # the GUI extracts on a worker thread
+
+    @staticmethod
+    def key(image_path, mode):
+        # None for anything but a path (a file object has no mtime to check) , which get / put skip
+        if not isinstance(image_path, (str, bytes, os.PathLike)):
+            return None
+        stat = os.stat(image_path)
+        return os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns, mode
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, plane, size):
+        # plane must not be changed afterwards (a Bitstream or str) , size is what it costs in memory
+        if key is None:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return  # would evict everything else and still not fit
+            while self._bytes + size > self.max_bytes:
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+            self._entries[key] = (plane, size)
+            self._bytes += size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+# Shared by decrypt.extract_bits / extract_message_bits , and through them the GUI , CLI and pixelguard
+PLANES = PlaneCache()
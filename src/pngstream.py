@@ -0,0 +1,227 @@
+import struct
+import zlib
+
+from PIL import Image
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+READ_SIZE = 64 * 1024  # compressed bytes pulled from the file at a time
+IDAT_SIZE = 64 * 1024  # compressed bytes per IDAT chunk written
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+PARTIAL_MAX_BYTES = 256 * 1024  # scanline bytes PartialPng unfilters in Python before Pillow's decoder is faster
+
+
+class PngReader:
+    # Reads a PNG one scanline at a time , inflating IDAT data only as far as the rows asked for
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            if self.file.read(8) != PNG_SIGNATURE:
+                raise ValueError("Not a PNG file")
+            length, ctype = self._chunk_header()
+            if ctype != b"IHDR":
+                raise ValueError("PNG is missing its IHDR chunk")
+            ihdr = self.file.read(length)
+            self.file.read(4)  # crc
+            (self.width, self.height, self.bit_depth, self.color_type,
+             _, _, self.interlace) = struct.unpack(">IIBBBBB", ihdr)
+
+            # Skip ancillary chunks up to the first IDAT
+            self.transparency = False  # a tRNS chunk , Pillow turns it into alpha when converting to RGBA
+            while True:
+                length, ctype = self._chunk_header()
+                if ctype == b"IDAT":
+                    break
+                if ctype == b"IEND":
+                    raise ValueError("PNG has no image data")
+                self.transparency |= ctype == b"tRNS"
+                self.file.seek(length + 4, 1)
+        except Exception:
+            self.file.close()
+            raise
+
+        self._idat_left = length
+        self._inflater = zlib.decompressobj()
+        self._tail = b""
+        self.bpp = max(1, CHANNELS[self.color_type] * self.bit_depth // 8)
+        self.row_bytes = (self.width * CHANNELS[self.color_type] * self.bit_depth + 7) // 8
+        self._prev = bytearray(self.row_bytes)
+
+    def _chunk_header(self):
+        header = self.file.read(8)
+        if len(header) < 8:
+            raise ValueError("PNG file is truncated")
+        return struct.unpack(">I4s", header)
+
+    def is_truecolor8(self):
+        # 8 bit RGB / RGBA without interlacing is what the streaming embedder can rewrite in place
+        return self.bit_depth == 8 and self.color_type in (2, 6) and self.interlace == 0
+
+    def _compressed(self):
+        # Next piece of the zlib stream , following the IDAT chunks in order
+        while self._idat_left == 0:
+            self.file.read(4)  # crc of the previous IDAT
+            length, ctype = self._chunk_header()
+            if ctype != b"IDAT":
+                return b""
+            self._idat_left = length
+        data = self.file.read(min(READ_SIZE, self._idat_left))
+        self._idat_left -= len(data)
+        return data
+
+    def read_raw(self, n):
+        # Up to n bytes of the inflated (still filtered) scanline stream
+        out = bytearray()
+        while len(out) < n:
+            if self._tail:
+                data, self._tail = self._tail, b""
+            else:
+                data = self._compressed()
+                if not data:
+                    break
+            out += self._inflater.decompress(data, n - len(out))
+            self._tail = self._inflater.unconsumed_tail
+        return bytes(out)
+
+    def read_row(self, limit=None):
+        # Next scanline , unfiltered. With limit only its first limit bytes are unfiltered and returned ,
+        # rows after that can then only be read with the same or a smaller limit (filters use the row above).
+        raw = self.read_raw(self.row_bytes + 1)
+        if len(raw) < self.row_bytes + 1:
+            raise ValueError("PNG image data is truncated")
+        row = unfilter(raw[0], raw[1:] if limit is None else raw[1:1 + limit], self._prev, self.bpp)
+        self._prev = row
+        return row
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PartialPng:
+    # Stands in for a PIL image when the extractors only need the top rows: the IDAT stream is
+    # inflated and unfiltered only down to the lowest row cropped so far , instead of Pillow
+    # decoding the whole image first. Once more than PARTIAL_MAX_BYTES of rows are asked for
+    # the image is handed to Pillow , whose C decoder wins for big reads.
+    # Offers what the extractors use: size , load() and crop().
+    def __init__(self, path):
+        self.path = path
+        self.reader = PngReader(path)
+        self.size = (self.reader.width, self.reader.height)
+        self.mode = "RGBA" if self.reader.color_type == 6 else "RGB"
+        self._rows = []  # unfiltered scanlines read so far
+        self._image = None  # the Pillow image , once the rows asked for pass the budget
+
+    def load(self):
+        pass  # rows are decoded as crop() reaches them
+
+    def crop(self, box):
+        left, top, right, bottom = box
+        if self._image is None and bottom * self.reader.row_bytes > PARTIAL_MAX_BYTES:
+            self.reader.close()
+            self._rows = []
+            self._image = Image.open(self.path)
+        if self._image is not None:
+            return self._image.crop(box)
+
+        while len(self._rows) < bottom:
+            self._rows.append(self.reader.read_row())
+        region = Image.frombytes(self.mode, (self.size[0], bottom - top), b"".join(self._rows[top:bottom]))
+        return region if (left, right) == (0, self.size[0]) else region.crop((left, 0, right, bottom - top))
+
+    def close(self):
+        self.reader.close()
+        if self._image is not None:
+            self._image.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_image(path):
+    # A PartialPng for 8 bit RGB / RGBA PNGs without interlacing or tRNS , a Pillow image for anything else
+    with open(path, "rb") as f:
+        is_png = f.read(8) == PNG_SIGNATURE
+    if is_png:
+        png = PartialPng(path)
+        if png.reader.is_truecolor8() and not png.reader.transparency:
+            return png
+        png.close()
+    return Image.open(path)
+
+
+class PngWriter:
+    # Writes an 8 bit PNG row by row , compressing as it goes
+    def __init__(self, path, width, height, color_type=2, compress_level=6):
+        self.file = open(path, "wb")
+        self.file.write(PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        self._deflater = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+
+    def _chunk(self, ctype, data):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(ctype)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(ctype)) & 0xFFFFFFFF))
+
+    def _flush_idat(self, final=False):
+        while len(self._pending) >= IDAT_SIZE or (final and self._pending):
+            self._chunk(b"IDAT", bytes(self._pending[:IDAT_SIZE]))
+            del self._pending[:IDAT_SIZE]
+
+    def write_raw(self, data):
+        # Already filtered scanline bytes (filter type byte + row)
+        self._pending += self._deflater.compress(data)
+        self._flush_idat()
+
+    def write_row(self, row):
+        self.write_raw(b"\x00" + bytes(row))  # filter type None
+
+    def close(self):
+        self._pending += self._deflater.flush()
+        self._flush_idat(final=True)
+        self._chunk(b"IEND", b"")
+        self.file.close()
+
+
+def unfilter(ftype, row, prev, bpp):
+    # Reverses one of the five PNG scanline filters , prev is the previous unfiltered row
+    out = bytearray(row)
+    n = len(out)
+    if ftype == 0:
+        pass
+    elif ftype == 1:  # Sub
+        for i in range(bpp, n):
+            out[i] = (out[i] + out[i - bpp]) & 0xFF
+    elif ftype == 2:  # Up
+        for i in range(n):
+            out[i] = (out[i] + prev[i]) & 0xFF
+    elif ftype == 3:  # Average
+        for i in range(n):
+            left = out[i - bpp] if i >= bpp else 0
+            out[i] = (out[i] + ((left + prev[i]) >> 1)) & 0xFF
+    elif ftype == 4:  # Paeth
+        for i in range(n):
+            a = out[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            c = prev[i - bpp] if i >= bpp else 0
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            if pa <= pb and pa <= pc:
+                pred = a
+            elif pb <= pc:
+                pred = b
+            else:
+                pred = c
+            out[i] = (out[i] + pred) & 0xFF
+    else:
+        raise ValueError(f"Unknown PNG filter type {ftype}")
+    return out
@@ -0,0 +1,123 @@
+from PIL import Image
+
+from bitstream import Bitstream
+from compression import METHODS
+from header import (CHECKSUM_BITS, CHECKSUM_VERSION, EXTENDED_FLAG, FLAG_CHECKSUM, FLAG_FILE, FLAG_LAYOUT, FLAG_SHARD,
+                    HEADER_BITS, HEADER_VERSION, LAYOUT_BITS, LAYOUT_VERSION, MAGIC, MAGIC_BITS, PROBE_BITS,
+                    SIGNED_VERSION)
+from layout import MODES, capacity_bits
+from pngstream import PNG_SIGNATURE, PngReader
+
+RAW_PIXEL_BYTES = {"L": 1, "RGB": 3, "BGR": 3, "RGBA": 4, "RGBX": 4, "BGRA": 4, "BGRX": 4}
+
+
+def probe(image_path):
+    # Answers "is there a PixelGuard payload here ?" from the first PROBE_BITS pixels , without decoding
+    # the rest of the image. 8 bit PNGs are inflated only that far and uncompressed BMP / TIFF rows are read
+    # straight from the file , anything else (JPEG , compressed TIFF , palette BMP) is decoded whole by Pillow.
+    # Returns {"path" , "status" , "mode" , "length" , ...} where status is
+    #   "payload"   a signed header whose payload fits the image , with its compression and which
+    #               of the file / shard / checksum fields it has
+    #   "possible"  an unsigned (legacy) header whose payload would fit , only decoding can tell
+    #   "none"      nothing that fits , no need to extract this image
+    result = {"path": image_path, "status": "none", "mode": None, "length": None}
+    width, height, rgb = _first_pixels(image_path, PROBE_BITS)
+    if not rgb:
+        return result
+
+    # The header is in the mode 1 layout when the first red LSB is 0 , in the mode 3 layout otherwise
+    mode = 1 if rgb[0] & 1 == 0 else 3
+    lsbs = rgb[0::3] if mode == 1 else rgb
+    bits = Bitstream.from_string("".join("1" if v & 1 else "0" for v in lsbs[:PROBE_BITS]))
+    if len(bits) < HEADER_BITS:
+        return result
+    field = bits.read_int(1, 32)
+    pixels = width * height
+
+    if not field & EXTENDED_FLAG:
+        if HEADER_BITS + field * 8 <= capacity_bits(mode, pixels, HEADER_BITS):
+            result.update(status="possible", mode=mode, length=field)
+        return result
+
+    length = field & ~EXTENDED_FLAG
+    start = HEADER_BITS + 16
+    if len(bits) < start + MAGIC_BITS:
+        return result
+    version = bits.read_int(HEADER_BITS, 8)
+    flags = bits.read_int(HEADER_BITS + 8, 8)
+    if version in (HEADER_VERSION, LAYOUT_VERSION, CHECKSUM_VERSION):
+        # Written before the signature , and still decoded , so such an image must not be skipped.
+        # The dense mode layout field is past the probed bits then
+        if HEADER_BITS + 16 + length * 8 <= capacity_bits(mode, pixels, HEADER_BITS + 16):
+            result.update(status="possible", mode=None if flags & FLAG_LAYOUT else mode, length=length)
+        return result
+    if version != SIGNED_VERSION or bits.read_bytes(start, len(MAGIC)) != MAGIC:
+        return result
+
+    start += MAGIC_BITS
+    if flags & FLAG_LAYOUT:
+        layout = bits.read_int(start, LAYOUT_BITS)
+        modes = {v: k for k, v in MODES.items()}
+        mode = modes.get((layout >> 4, layout & 0xF))
+        if mode is None:
+            return result
+        start += LAYOUT_BITS
+    if flags & FLAG_CHECKSUM:
+        start += CHECKSUM_BITS
+    # The file name is not read , so this is the smallest the header can be
+    if start + length * 8 > capacity_bits(mode, pixels, start):
+        return result
+    result.update(status="payload", mode=mode, length=length, compression=METHODS[flags & 0b11],
+                  file=bool(flags & FLAG_FILE), shard=bool(flags & FLAG_SHARD), checksum=bool(flags & FLAG_CHECKSUM))
+    return result
+
+
+def _first_pixels(image_path, n):
+    # (width , height , R G B values of the first n pixels in row order)
+    with open(image_path, "rb") as f:
+        is_png = f.read(8) == PNG_SIGNATURE
+    if is_png:
+        with PngReader(image_path) as png:
+            if png.is_truecolor8():
+                channels = png.bpp
+                values = bytearray()
+                left = min(n, png.width * png.height)
+                while left > 0:
+                    take = min(left, png.width)
+                    row = png.read_row(take * channels)
+                    if channels == 4:
+                        row = bytearray(row)  # a copy , the reader keeps the row for the next one's filter
+                        del row[3::4]  # drop alpha , the header never uses it
+                    values += row
+                    left -= take
+                return png.width, png.height, bytes(values)
+
+    with Image.open(image_path) as img:
+        width, height = img.size
+        rows = min(height, -(-n // width)) if width else 0
+        if not rows:
+            return width, height, b""
+        part = _first_rows(img, rows)
+        if part is None:
+            part = img.crop((0, 0, width, rows))  # decodes the whole image
+        return width, height, part.convert("RGB").tobytes()[:n * 3]
+
+
+def _first_rows(img, rows):
+    # The top rows of an uncompressed image , read from its first strip without decoding the rest.
+    # None when the image is stored any other way.
+    if not img.tile or img.mode not in ("L", "RGB", "RGBA"):
+        return None
+    codec, (x0, y0, x1, y1), offset, args = img.tile[0]
+    args = args if isinstance(args, tuple) else (args,)
+    rawmode, stride, orientation = (args + (0, 1))[:3]
+    if codec != "raw" or (x0, y0, x1) != (0, 0, img.width) or y1 < rows or rawmode not in RAW_PIXEL_BYTES:
+        return None
+    stride = stride or img.width * RAW_PIXEL_BYTES[rawmode]
+    if orientation < 0:
+        offset += (y1 - rows) * stride  # stored bottom up , the top rows are at the end of the strip
+    img.fp.seek(offset)
+    data = img.fp.read(rows * stride)
+    if len(data) < rows * stride:
+        return None
+    return Image.frombytes(img.mode, (img.width, rows), data, "raw", rawmode, stride, orientation)
@@ -0,0 +1,22 @@
+PROGRESS_ROWS = 64  # image rows between progress reports / cancel checks
+
+
+class Cancelled(Exception):
+    # Raised by embed_bits / extract_bits when their cancel token is set
+    pass
+
+
+class Progress:
+    # Optional progress callback (called with the fraction done) and cancel token
+    # cancel is anything with is_set() , e.g. a threading.Event
+    def __init__(self, callback=None, cancel=None, every=PROGRESS_ROWS):
+        self.callback = callback
+        self.cancel = cancel
+        self.every = max(1, every)
+        self.active = callback is not None or cancel is not None
+
+    def update(self, fraction):
+        if self.cancel is not None and self.cancel.is_set():
+            raise Cancelled("Operation cancelled")
+        if self.callback is not None:
+            self.callback(min(1.0, fraction))
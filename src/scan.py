@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from decrypt import extract_message_bits, decode_message
+from header import Header
+from probe import probe
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+def walk_images(root):
+    # Generator so the tree is never listed into memory up front
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def scan_one(job):
+    path, key, with_timings = job
+    result = {"path": path, "mode": None, "length": None, "compression": None}
+    extract_timings, decode_timings = {}, {}
+    try:
+        # Reading the first pixels is enough to skip images with no header that fits
+        if probe(path)["status"] == "none":
+            raise ValueError("No PixelGuard payload found")
+        # Each image is read once , caching its bits would only fill the worker's memory
+        bits = extract_message_bits(path, timings=extract_timings, cache=False)
+        header = Header.parse(bits)
+        result["mode"] = header.mode
+        result["length"] = header.length
+        result["compression"] = header.compression
+        if header.shard is not None:
+            # One piece of a sharded payload , shard.py join reassembles the set
+            result["shard"] = {"set": header.shard[0], "index": header.shard[1], "count": header.shard[2]}
+            return _with_timings(result, with_timings, extract_timings, decode_timings)
+        if header.filename is not None:
+            # A hidden file , reported but not written anywhere (decrypt.py --out saves it)
+            result["file"] = header.filename
+            result["file_size"] = header.file_size
+            return _with_timings(result, with_timings, extract_timings, decode_timings)
+        if len(bits) < header.size + header.length * 8:
+            raise ValueError("Length in header is larger than the image can hold")
+        result["message"], _ = decode_message(bits, key, timings=decode_timings)
+    except Exception as e:
+        result["error"] = str(e)
+    return _with_timings(result, with_timings, extract_timings, decode_timings)
+
+
+def _with_timings(result, with_timings, extract_timings, decode_timings):
+    if with_timings:
+        result["timings"] = {"extract": extract_timings, "decode": decode_timings}
+    return result
+
+
+def probe_one(path):
+    # Runs in a worker process , an unreadable file is reported instead of stopping the run
+    try:
+        return probe(path)
+    except Exception as e:
+        return {"path": path, "status": "error", "error": str(e)}
+
+
+def probe_tree(root, workers=None):
+    # Yields probe() for every image under root as they finish , in large chunks since each one is tiny
+    with Pool(processes=workers or os.cpu_count() or 1) as pool:
+        for result in pool.imap_unordered(probe_one, walk_images(root), chunksize=256):
+            yield result
+
+
+def scan(root, key, workers=None, with_timings=False):
+    # Yields one result dict per image as soon as its worker finishes
+    jobs = ((path, key, with_timings) for path in walk_images(root))
+    with Pool(processes=workers or os.cpu_count() or 1) as pool:
+        for result in pool.imap_unordered(scan_one, jobs, chunksize=4):
+            yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode hidden messages from every image under a directory")
+    parser.add_argument("root", help="directory to scan recursively")
+    parser.add_argument("--key", help="decryption key")
+    parser.add_argument("--probe", action="store_true",
+                        help="only check which images hold a payload (from their first pixels , no key needed)")
+    parser.add_argument("--out", help="JSON Lines output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument("--timings", action="store_true", help="add per stage timings to each result")
+    args = parser.parse_args()
+    if not args.probe and not args.key:
+        parser.error("--key is required unless --probe is given")
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    count = 0
+    failed = 0
+    start = time.perf_counter()
+    statuses = {"payload": 0, "possible": 0, "none": 0, "error": 0}
+    try:
+        results = probe_tree(args.root, args.workers) if args.probe else scan(args.root, args.key, args.workers, args.timings)
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            count += 1
+            failed += "error" in result
+            if args.probe:
+                statuses[result["status"]] += 1
+    finally:
+        if args.out:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    if args.probe:
+        print(f"Probed {count} images in {elapsed:.2f}s: {statuses['payload']} with a payload , {statuses['possible']} "
+              f"possible (unsigned header) , {statuses['none']} without , {statuses['error']} unreadable", file=sys.stderr)
+    else:
+        print(f"Scanned {count} images ({failed} without a readable message) in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
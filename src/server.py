@@ -0,0 +1,250 @@
+# Local HTTP service for encode / decode / capacity , stdlib only
+#
+#   python src/server.py --port 8765 --workers 4
+#
+# POST /encode    {"cover": base64 image , "message": text or "data": base64 bytes , "key": ... ,
+#                  "mode": 3 , "profile": "default" , "compress": null , "checksum": false}  -> the stego image bytes
+# POST /decode    {"image": base64 image , "key": ...}  -> {"mode": 3 , "message": text} or {"mode": 3 , "data": base64 , "filename": ...}
+# POST /capacity  {"image": base64 image , "compress": null , "checksum": false}
+#                 -> {"width": ... , "height": ... , "capacity": {"1": bytes , "3": bytes , ...}}
+# GET  /health    -> {"ok": true , "in_flight": n , "max_queue": m}
+#
+# Encode and decode run in a process pool through pixelguard , the same core functions the CLIs use.
+# At most max_queue of them are running or waiting at once , past that the server answers 429.
+
+import argparse
+import base64
+import binascii
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from PIL import Image, UnidentifiedImageError
+
+import pixelguard
+from encrypt import MODE_BITS, SAVE_PROFILES, capacity
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BODY = 64 * 1024 * 1024
+CONTENT_TYPES = {"PNG": "image/png", "BMP": "image/bmp", "TIFF": "image/tiff"}
+
+
+def encode_job(cover, message, data, key, mode, profile, compress, checksum):
+    # Runs in a worker process , returns (image bytes , worker start time , timings)
+    started = time.time()
+    timings = {}
+    payload = message if message is not None else data
+    image = pixelguard.encode(cover, payload, key, mode, profile=profile, compress=compress, timings=timings,
+                              checksum=checksum)
+    return image, started, timings
+
+
+def decode_job(image, key, max_size):
+    # Runs in a worker process , returns (result dict , worker start time , timings).
+    # A compressed payload is not unpacked past max_size bytes , so a small image cannot expand to gigabytes
+    started = time.time()
+    timings = {}
+    img = pixelguard.load_image(image)
+    payload = pixelguard.decode(img, key, timings=timings, max_size=max_size)
+    header = pixelguard.read_header(img)
+    result = {"mode": header.mode}
+    if isinstance(payload, str):
+        result["message"] = payload
+    else:
+        result["data"] = base64.b64encode(payload).decode("ascii")
+        if header.filename:
+            result["filename"] = header.filename
+    return result, started, timings
+
+
+def capacity_info(image, checksum=False, compress=None):
+    # Only the image header is read , cheap enough to answer on the request thread
+    with Image.open(io.BytesIO(image)) as img:
+        width, height = img.size
+    sizes = {str(mode): capacity(io.BytesIO(image), mode, checksum, compress) for mode in sorted(MODE_BITS)}
+    return {"width": width, "height": height, "capacity": sizes}
+
+
+class RequestError(Exception):
+    # Answered with its status code and message , anything else is a 500
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class StegoServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, max_queue=None, max_body=DEFAULT_MAX_BODY, log=None):
+        super().__init__(address, StegoHandler)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue or self.workers * 2
+        self.max_body = max_body
+        self.log = log or (lambda line: print(line, file=sys.stderr, flush=True))
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.slots = threading.BoundedSemaphore(self.max_queue)
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def run(self, fn, *args):
+        # Hands fn to the pool unless max_queue jobs are already running or waiting.
+        # Returns (result , timings , seconds queued , seconds working).
+        if not self.slots.acquire(blocking=False):
+            raise RequestError(429, "Server is busy , retry shortly", {"Retry-After": "1"})
+        with self.lock:
+            self.in_flight += 1
+        try:
+            submitted = time.time()
+            result, started, timings = self.pool.submit(fn, *args).result()
+            return result, timings, started - submitted, time.time() - started
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+
+class StegoHandler(BaseHTTPRequestHandler):
+    server_version = "PixelGuard"
+
+    def do_GET(self):
+        start = time.perf_counter()
+        if urlsplit(self.path).path != "/health":
+            return self.finish_request(start, 404, {"error": "Not found"})
+        with self.server.lock:
+            in_flight = self.server.in_flight
+        self.finish_request(start, 200, {"ok": True, "in_flight": in_flight, "max_queue": self.server.max_queue})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        route = urlsplit(self.path).path
+        queued = worked = None
+        try:
+            if route not in ("/encode", "/decode", "/capacity"):
+                raise RequestError(404, "Not found")
+            request = self.read_json()
+
+            if route == "/capacity":
+                image = self.image_field(request, "image")
+                info = capacity_info(image, bool(request.get("checksum")), request.get("compress"))
+                return self.finish_request(start, 200, info)
+
+            key = request.get("key")
+            if not isinstance(key, str) or not key:
+                raise RequestError(400, "key is required and must be a string")
+            if route == "/decode":
+                # The answer is capped like a request , it is sent back base64 encoded just the same
+                result, timings, queued, worked = self.server.run(decode_job, self.image_field(request, "image"), key,
+                                                                  self.server.max_body)
+                return self.finish_request(start, 200, {**result, "timings": timings}, queued, worked)
+
+            cover = self.image_field(request, "cover")
+            mode = request.get("mode", 3)
+            profile = request.get("profile", "default")
+            if not isinstance(mode, int) or isinstance(mode, bool) or mode not in MODE_BITS:
+                raise RequestError(400, f"mode must be one of {sorted(MODE_BITS)}")
+            if profile not in SAVE_PROFILES:
+                raise RequestError(400, f"profile must be one of {sorted(SAVE_PROFILES)}")
+            message = request.get("message")
+            data = self.base64_field(request, "data") if "data" in request else None
+            if (message is None) == (data is None):
+                raise RequestError(400, "send exactly one of message or data")
+            if message is not None and not isinstance(message, str):
+                raise RequestError(400, "message must be a string , send bytes as base64 data")
+            image, timings, queued, worked = self.server.run(encode_job, cover, message, data, key, mode, profile,
+                                                             request.get("compress"), bool(request.get("checksum")))
+            self.finish_request(start, 200, image, queued, worked, CONTENT_TYPES[SAVE_PROFILES[profile][0]])
+        except RequestError as e:
+            self.finish_request(start, e.status, {"error": str(e)}, queued, worked, headers=e.headers)
+        except UnidentifiedImageError:
+            # An OSError , so it would otherwise be answered as a server fault
+            self.finish_request(start, 400, {"error": "Not an image that can be read (PNG , BMP , TIFF or JPEG)"},
+                                queued, worked)
+        except ValueError as e:
+            # What the core functions raise for bad input , e.g. a message too large for the cover or a wrong key
+            self.finish_request(start, 400, {"error": str(e)}, queued, worked)
+        except Exception as e:
+            self.finish_request(start, 500, {"error": f"{type(e).__name__}: {e}"}, queued, worked)
+
+    def read_json(self):
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise RequestError(411, "Content-Length is required")
+        if int(length) > self.server.max_body:
+            raise RequestError(413, f"Request body is larger than {self.server.max_body} bytes")
+        try:
+            request = json.loads(self.rfile.read(int(length)))
+        except json.JSONDecodeError as e:
+            raise RequestError(400, f"Body is not valid JSON: {e}")
+        if not isinstance(request, dict):
+            raise RequestError(400, "Body must be a JSON object")
+        return request
+
+    def base64_field(self, request, name):
+        try:
+            return base64.b64decode(request[name], validate=True)
+        except (KeyError, TypeError, binascii.Error):
+            raise RequestError(400, f"{name} must be base64 encoded")
+
+    def image_field(self, request, name):
+        if name not in request:
+            raise RequestError(400, f"{name} is required")
+        return self.base64_field(request, name)
+
+    def finish_request(self, start, status, body, queued=None, worked=None, content_type=None, headers=None):
+        if isinstance(body, (bytes, bytearray)):
+            data = bytes(body)
+        else:
+            data = json.dumps(body).encode("utf-8")
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+        # One latency line per request , split into queue wait and pool work when the pool was used
+        line = f"{self.command} {urlsplit(self.path).path} {status} {(time.perf_counter() - start) * 1000:.1f} ms"
+        if queued is not None:
+            line += f" (queued {queued * 1000:.1f} ms , work {worked * 1000:.1f} ms)"
+        self.server.log(line)
+
+    def log_message(self, format, *args):
+        pass  # finish_request logs every request with its latency instead
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve encode / decode / capacity over HTTP on this machine")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument("--max-queue", type=int, help="encode / decode jobs running or waiting before 429 (default: 2 x workers)")
+    parser.add_argument("--max-body", type=int, default=DEFAULT_MAX_BODY // (1024 * 1024), help="largest request body in MB (default: 64)")
+    args = parser.parse_args()
+
+    server = StegoServer((args.host, args.port), args.workers, args.max_queue, args.max_body * 1024 * 1024)
+    print(f"PixelGuard service on http://{args.host}:{args.port} ({server.workers} workers , queue limit {server.max_queue})",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
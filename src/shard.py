@@ -0,0 +1,244 @@
+import argparse
+import os
+import sys
+import time
+import zlib
+from functools import partial
+from multiprocessing import Pool
+
+from PIL import Image
+
+import compression
+from batch_encrypt import find_covers
+from bitstream import Bitstream
+from decrypt import extract_message_bits, xor_decrypt
+from encrypt import MODE_BITS, SAVE_PROFILES, embed_bits, xor_encrypt
+from header import Header
+from layout import capacity_bits
+
+MAX_SHARDS = (1 << 16) - 1  # the index and count fields are 16 bits
+
+
+def cover_pixels(image_path):
+    with Image.open(image_path) as img:
+        width, height = img.size
+    return width * height
+
+
+def split_sizes(room, total):
+    # Payload bytes per cover , in proportion to what each cover holds so the workers get similar shares
+    available = sum(room)
+    if total > available:
+        raise ValueError(f"Payload is {total} bytes but the covers only hold {available} bytes together")
+    sizes = [total * r // available if available else 0 for r in room]
+    left = total - sum(sizes)
+    for i, r in enumerate(room):
+        # Rounding leftovers go to the first covers with space
+        extra = min(left, r - sizes[i])
+        sizes[i] += extra
+        left -= extra
+    return sizes
+
+
+def build_shards(payload, key, mode, pixels, compress=None, filename=None, set_id=None, checksum=False):
+    # Compresses and encrypts the whole payload once , then cuts it into one bitstream per cover.
+    # pixels are the covers' sizes (cover_pixels) , in shard order.
+    # With filename the payload is a file and every shard carries its name and size.
+    # With checksum every shard carries the CRC32 of the whole payload , checked by join.
+    if not 1 <= len(pixels) <= MAX_SHARDS:
+        raise ValueError(f"A shard set needs 1 to {MAX_SHARDS} covers")
+    method, packed = compression.choose(payload, compress) if compress else ("none", payload)
+    crc = zlib.crc32(packed) if checksum else None
+    encrypted = xor_encrypt(packed, key)
+    set_id = int.from_bytes(os.urandom(4), "big") if set_id is None else set_id
+    count = len(pixels)
+    file_size = len(payload) if filename is not None else None
+
+    # Every shard header has the same size , so it comes off each cover's capacity up front
+    header_bits = Header(mode, 0, method, filename, file_size, (set_id, 0, count), crc).size
+    room = [max(0, (capacity_bits(mode, n, header_bits) - header_bits) // 8) for n in pixels]
+    sizes = split_sizes(room, len(encrypted))
+
+    shards = []
+    start = 0
+    for index, size in enumerate(sizes):
+        header = Header(mode, size, method, filename, file_size, (set_id, index, count), crc)
+        shards.append(Bitstream.concat(header.to_bitstream(), Bitstream(encrypted[start:start + size])))
+        start += size
+    return shards
+
+
+def embed_shard(job, profile="default"):
+    # Runs in a worker process
+    image_path, bitstream, mode, output_path = job
+    start = time.perf_counter()
+    try:
+        timings = {}
+        embed_bits(image_path, bitstream, mode, output_path, profile=profile, timings=timings)
+        return {"image": image_path, "output": output_path, "ok": True,
+                "seconds": time.perf_counter() - start, "timings": timings}
+    except Exception as e:
+        return {"image": image_path, "output": output_path, "ok": False,
+                "error": str(e), "seconds": time.perf_counter() - start}
+
+
+def split(payload, key, covers, mode, outputs, compress=None, filename=None, workers=None, profile="default",
+          report=print, checksum=False):
+    # Embeds one shard per cover in parallel , covers and outputs are in shard order
+    shards = build_shards(payload, key, mode, [cover_pixels(c) for c in covers], compress, filename, checksum=checksum)
+    jobs = [(cover, shard, mode, output) for cover, shard, output in zip(covers, shards, outputs)]
+    workers = workers or os.cpu_count() or 1
+
+    results = []
+    with Pool(processes=min(workers, len(jobs))) as pool:
+        for result in pool.imap_unordered(partial(embed_shard, profile=profile), jobs):
+            if result["ok"]:
+                report(f"OK    {result['image']} -> {result['output']} ({result['seconds']:.2f}s)")
+            else:
+                report(f"FAIL  {result['image']}: {result['error']}")
+            results.append(result)
+    return results
+
+
+def read_shard(image_path):
+    # Runs in a worker process , returns (path , header , encrypted bytes , error).
+    # Every shard is read once , so its planes would only push others out of the worker's cache
+    try:
+        bits = extract_message_bits(image_path, cache=False)
+        header = Header.parse(bits)
+        if header.shard is None:
+            raise ValueError("Not part of a shard set")
+        if len(bits) < header.size + header.length * 8:
+            raise ValueError("Length in header is larger than the image can hold")
+        return image_path, header, bits.read_bytes(header.size, header.length), None
+    except Exception as e:
+        return image_path, None, None, str(e)
+
+
+def join(paths, key, workers=None):
+    # Reads the shards in parallel and puts them back in index order , whatever order the paths come in.
+    # Returns (header of one shard , payload bytes) , header.filename is set when the payload is a file.
+    if not paths:
+        raise ValueError("No images to join")
+    workers = workers or os.cpu_count() or 1
+    pieces = {}
+    first = None
+    with Pool(processes=min(workers, len(paths))) as pool:
+        for path, header, data, error in pool.imap_unordered(read_shard, paths):
+            if error is not None:
+                raise ValueError(f"{path}: {error}")
+            set_id, index, count = header.shard
+            if first is None:
+                first = header
+            elif set_id != first.shard[0]:
+                raise ValueError("The images belong to more than one shard set")
+            if index in pieces:
+                raise ValueError(f"{path}: shard {index + 1} is there twice")
+            pieces[index] = data
+
+    count = first.shard[2]
+    missing = [str(i + 1) for i in range(count) if i not in pieces]
+    if missing:
+        raise ValueError(f"Missing shard(s) {', '.join(missing)} of {count}")
+
+    payload = xor_decrypt(b"".join(pieces[i] for i in range(count)), key)
+    if first.checksum is not None and zlib.crc32(payload) != first.checksum:
+        raise ValueError("Checksum does not match , wrong key or damaged image")
+    if first.compression != "none":
+        try:
+            payload = compression.decompress(payload, first.compression)
+        except compression.ERRORS as e:
+            raise ValueError(f"Could not unpack the payload , wrong key or damaged image ({e})")
+    if first.filename is not None and len(payload) != first.file_size:
+        raise ValueError(f"Recovered {len(payload)} bytes but the header says {first.file_size} , wrong key or damaged image")
+    return first, bytes(payload)
+
+
+def expand_paths(paths):
+    # Directories stand for the images in them
+    images = []
+    for path in paths:
+        images.extend(find_covers(path) if os.path.isdir(path) else [path])
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split one payload across several cover images , or join it back")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split_cmd = commands.add_parser("split", help="hide one payload across the covers , in the order given")
+    split_cmd.add_argument("covers", nargs="+", help="cover images (or directories of them)")
+    split_cmd.add_argument("--out", required=True, help="directory for the encoded images")
+    split_cmd.add_argument("--message", help="message to hide")
+    split_cmd.add_argument("--message-file", help="read the message from a text file")
+    split_cmd.add_argument("--file", help="hide this file (any type) instead of a message")
+    split_cmd.add_argument("--key", required=True, help="encryption key")
+    split_cmd.add_argument("--mode", type=int, choices=sorted(MODE_BITS), default=3, help="bits hidden per pixel (default: 3)")
+    split_cmd.add_argument("--compress", nargs="?", const="auto", choices=("auto",) + compression.METHODS[1:],
+                           help="compress the payload before encrypting (default method: auto)")
+    split_cmd.add_argument("--checksum", action="store_true", help="store a CRC32 so a wrong key is rejected straight away")
+    split_cmd.add_argument("--profile", choices=sorted(SAVE_PROFILES), default="default", help="output format / compression")
+    split_cmd.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+
+    join_cmd = commands.add_parser("join", help="reassemble a payload from its shard images , in any order")
+    join_cmd.add_argument("images", nargs="+", help="shard images (or directories of them)")
+    join_cmd.add_argument("--key", required=True, help="decryption key")
+    join_cmd.add_argument("--out", default=".", help="where a hidden file is saved , a directory or file path (default: .)")
+    join_cmd.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "split":
+        covers = expand_paths(args.covers)
+        filename = None
+        if args.file:
+            with open(args.file, "rb") as f:
+                payload = f.read()
+            filename = os.path.basename(args.file)
+        elif args.message_file:
+            with open(args.message_file, encoding="ascii") as f:
+                payload = f.read().encode("ascii")
+        elif args.message is not None:
+            payload = args.message.encode("ascii")
+        else:
+            parser.error("split needs --message , --message-file or --file")
+
+        os.makedirs(args.out, exist_ok=True)
+        extension = SAVE_PROFILES[args.profile][1]
+        outputs = [os.path.join(args.out, os.path.splitext(os.path.basename(c))[0] + extension) for c in covers]
+        if len(set(outputs)) != len(outputs):
+            parser.error("two covers have the same name , the outputs would overwrite each other")
+
+        print(f"=================Shard Encoder ({len(covers)} images , {args.workers} workers) ==================")
+        try:
+            results = split(payload, args.key, covers, args.mode, outputs, args.compress, filename, args.workers, args.profile,
+                            checksum=args.checksum)
+        except ValueError as e:
+            print("Error:", e)
+            return 1
+        failed = sum(not r["ok"] for r in results)
+        print(f"\n{len(results) - failed} shards written , {failed} failed in {time.perf_counter() - start:.2f}s")
+        return 1 if failed else 0
+
+    try:
+        header, payload = join(expand_paths(args.images), args.key, args.workers)
+    except ValueError as e:
+        print("Error:", e)
+        return 1
+    if header.filename is None:
+        print("Hidden Message: ", payload.decode("ascii"))
+        return 0
+
+    output = args.out
+    if os.path.isdir(output):
+        # Never trust a stored path , only its last component is used
+        name = os.path.basename(header.filename.replace("\\", "/"))
+        output = os.path.join(output, name if name not in ("", ".", "..") else "payload.bin")
+    with open(output, "wb") as f:
+        f.write(payload)
+    print(f"Hidden File: {header.filename} ({len(payload)} bytes) saved to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
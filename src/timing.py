@@ -0,0 +1,42 @@
+import time
+
+
+class StageTimer:
+    # Per stage wall time and counters for one encode / decode call
+    # sink is a dict to fill in , a callable that receives the result , or None
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.stages = {}
+        self.counters = {}
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    def mark(self, name):
+        # Closes the stage that ran since the previous mark
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def add(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        result = {"stages": dict(self.stages), **self.counters,
+                  "total_seconds": time.perf_counter() - self._start}
+        if callable(self.sink):
+            self.sink(result)
+        elif self.sink is not None:
+            self.sink.update(result)
+        return result
+
+
+def format_timings(timings):
+    # Readable breakdown for the CLIs and the GUI
+    lines = []
+    for name, seconds in timings.get("stages", {}).items():
+        lines.append(f"  {name:<12} {seconds * 1000:10.2f} ms")
+    lines.append(f"  {'total':<12} {timings.get('total_seconds', 0.0) * 1000:10.2f} ms")
+    for name, value in timings.items():
+        if name not in ("stages", "total_seconds"):
+            lines.append(f"  {name:<16} {value}")
+    return "\n".join(lines)
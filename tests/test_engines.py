@@ -0,0 +1,52 @@
+# The NumPy engine and the pixel loop must write the same pixels , and both must decode
+#
+#   python -m pytest tests
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from PIL import Image
+
+import bitstream
+import decrypt
+import layout
+from decrypt import decode_message, extract_from_image
+from encrypt import build_bitstream, embed_image
+
+KEY = "key"
+
+
+def cover(mode, size=(40, 30)):
+    # Noise without 0 values , the embedder never raises a 0 to 1
+    rng = random.Random(mode)
+    return Image.frombytes(mode, size, bytes(rng.randrange(1, 256) for _ in range(size[0] * size[1] * len(mode))))
+
+
+@pytest.mark.parametrize("cover_mode, mode", [("RGB", 1), ("RGB", 3), ("RGB", 6), ("RGB", 9), ("RGB", 12),
+                                              ("RGBA", 1), ("RGBA", 3), ("RGBA", 4), ("RGBA", 8), ("RGBA", 16)])
+def test_numpy_matches_loop(cover_mode, mode):
+    message = "engines " * 12
+    bits = build_bitstream(message, KEY, mode)
+    img = cover(cover_mode)
+    fast = embed_image(img, bits, mode, engine="numpy")
+    slow = embed_image(img, bits, mode, engine="loop")
+    assert img.tobytes() == cover(cover_mode).tobytes()  # the cover is left as it is
+    assert fast.mode == slow.mode
+    assert fast.tobytes() == slow.tobytes()
+    assert decode_message(extract_from_image(slow), KEY) == (message, mode)
+
+
+@pytest.mark.parametrize("cover_mode, mode", [("RGB", 1), ("RGB", 3), ("RGB", 6), ("RGBA", 16)])
+def test_extract_without_numpy(monkeypatch, cover_mode, mode):
+    img = embed_image(cover(cover_mode), build_bitstream("either way", KEY, mode), mode)
+    expected = extract_from_image(img)
+    for module in (bitstream, decrypt, layout):
+        monkeypatch.setattr(module, "HAS_NUMPY", False)
+    bits = extract_from_image(img)
+    assert str(bits) == str(expected)
+    assert decode_message(bits, KEY) == ("either way", mode)
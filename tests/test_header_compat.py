@@ -0,0 +1,72 @@
+# Headers written before the signature (versions 1 to 3) must stay readable
+#
+#   python -m pytest tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from PIL import Image
+
+from bitstream import Bitstream
+from decrypt import decode_file, decode_message
+from encrypt import build_bitstream, embed_image
+from header import HEADER_BITS, SIGNED_VERSION, Header
+from probe import probe
+
+KEY = "key"
+
+# (bit length , hex) as build_bitstream / build_data_bitstream wrote them at the commit named
+V1_ZLIB = (225, "c000000b008089dfd952161451969a13962a1cd6ef26bb3c8eef331500")  # 652fbc4 , mode 3 , zlib
+V3_DENSE_CHECKSUM = (225, "c0000008819819172b013407800b8c002c85058ea58308870309070080")  # ff1480c , mode 6 , checksum
+V3_FILE_CHECKSUM = (281, "c00000058192000000000000000582b0973134b747e6da8a86860a87228d82008035cd00")  # ff1480c , "a.bin"
+
+
+def stored(fixture):
+    length, text = fixture
+    return Bitstream(bytes.fromhex(text), length)
+
+
+def with_version(bits, version):
+    # The same bits with another version byte
+    shift = len(bits) - HEADER_BITS - 8
+    return Bitstream.from_int(bits.to_int() & ~(0xFF << shift) | version << shift, len(bits))
+
+
+def probed(bits, tmp_path):
+    path = str(tmp_path / "stego.png")
+    embed_image(Image.new("RGB", (40, 30), "white"), bits, 3).save(path)
+    return probe(path)
+
+
+def test_v1_compressed_message():
+    assert decode_message(stored(V1_ZLIB), KEY) == ("old header " * 8, 3)
+
+
+def test_v3_dense_message_with_checksum():
+    bits = stored(V3_DENSE_CHECKSUM)
+    assert Header.parse(bits).version == 3
+    assert decode_message(bits, KEY) == ("dense and checked", 6)
+
+
+def test_v3_file_with_checksum():
+    data, header = decode_file(stored(V3_FILE_CHECKSUM), KEY)
+    assert data == b"file body\x00\xff"
+    assert (header.filename, header.file_size) == ("a.bin", 11)
+
+
+def test_new_headers_are_signed():
+    bits = build_bitstream("signed", KEY, 3, checksum=True)
+    assert Header.parse(bits).version == SIGNED_VERSION
+    assert decode_message(bits, KEY) == ("signed", 3)
+
+
+def test_probe_does_not_skip_unsigned_versions(tmp_path):
+    assert probed(stored(V1_ZLIB), tmp_path)["status"] == "possible"
+    assert probed(stored(V3_DENSE_CHECKSUM), tmp_path)["status"] == "possible"
+
+
+def test_probe_rejects_unknown_versions(tmp_path):
+    for version in (0, SIGNED_VERSION + 1):
+        assert probed(with_version(stored(V1_ZLIB), version), tmp_path)["status"] == "none"
@@ -0,0 +1,109 @@
+# The streaming PNG reader and the max_memory embedder must match what Pillow and the in memory path give
+#
+#   python -m pytest tests
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from PIL import Image
+
+import bitstream
+import encrypt
+import layout
+from decrypt import decode_message, extract_message_bits
+from encrypt import build_bitstream, embed_bits
+from pngstream import PngReader, PngWriter
+
+KEY = "key"
+FILTERS = [0, 1, 2, 3, 4, "mixed"]  # the five PNG filter types , then a different one on every row
+
+
+def paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def filtered(ftype, row, prev, bpp):
+    # The forward filter , so every type can be written on purpose (Pillow picks its own)
+    out = bytearray(len(row))
+    for i in range(len(row)):
+        a = row[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+        out[i] = (row[i] - (0, a, b, (a + b) // 2, paeth(a, b, c))[ftype]) & 0xFF
+    return out
+
+
+def write_cover(path, mode, filters, size=(40, 30)):
+    # A noisy cover written with the given filter type (or "mixed") on its scanlines. No 0 values:
+    # the embedder only ever decrements , so a 0 that should hold a 1 stays 0 with every engine
+    width, height = size
+    bpp = len(mode)
+    rng = random.Random(f"{mode}{filters}")
+    pixels = bytes(rng.randrange(1, 256) for _ in range(width * height * bpp))
+    writer = PngWriter(path, width, height, 6 if mode == "RGBA" else 2)
+    prev = bytearray(width * bpp)
+    for y in range(height):
+        row = pixels[y * width * bpp:(y + 1) * width * bpp]
+        ftype = y % 5 if filters == "mixed" else filters
+        writer.write_raw(bytes([ftype]) + filtered(ftype, row, prev, bpp))
+        prev = row
+    writer.close()
+    return Image.frombytes(mode, size, pixels)
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA"])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_reader_unfilters_like_pillow(tmp_path, mode, filters):
+    path = str(tmp_path / "cover.png")
+    expected = write_cover(path, mode, filters)
+    with Image.open(path) as img:
+        assert img.tobytes() == expected.tobytes()
+    with PngReader(path) as png:
+        rows = b"".join(png.read_row() for _ in range(png.height))
+    assert rows == expected.tobytes()
+
+
+def embed_both(tmp_path, cover_mode, filters, mode, message):
+    cover = str(tmp_path / "cover.png")
+    write_cover(cover, cover_mode, filters)
+    bits = build_bitstream(message, KEY, mode)
+    streamed, in_memory = str(tmp_path / "streamed.png"), str(tmp_path / "in_memory.png")
+    # A couple of rows per stripe , so the payload spans several stripes and the rest is copied through
+    timings = {}
+    embed_bits(cover, bits, mode, streamed, max_memory=2400, timings=timings)
+    embed_bits(cover, bits, mode, in_memory)
+    assert "copy" in timings["stages"]  # the streamed path really ran
+    return streamed, in_memory
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("cover_mode, mode", [("RGB", 1), ("RGB", 3), ("RGB", 6), ("RGB", 12),
+                                              ("RGBA", 1), ("RGBA", 3), ("RGBA", 4), ("RGBA", 16)])
+def test_streamed_matches_in_memory(tmp_path, cover_mode, mode, filters):
+    message = "streamed " * 10
+    streamed, in_memory = embed_both(tmp_path, cover_mode, filters, mode, message)
+    with Image.open(streamed) as a, Image.open(in_memory) as b:
+        assert a.mode == b.mode == ("RGBA" if layout.uses_alpha(mode) else "RGB")
+        assert a.tobytes() == b.tobytes()
+    assert decode_message(extract_message_bits(streamed, cache=False), KEY) == (message, mode)
+
+
+@pytest.mark.parametrize("cover_mode, mode", [("RGB", 3), ("RGB", 9), ("RGBA", 1), ("RGBA", 8)])
+def test_streamed_without_numpy(tmp_path, monkeypatch, cover_mode, mode):
+    message = "no numpy " * 10
+    expected, _ = embed_both(tmp_path, cover_mode, "mixed", mode, message)
+    os.rename(expected, str(tmp_path / "expected.png"))
+    for module in (bitstream, encrypt, layout):
+        monkeypatch.setattr(module, "HAS_NUMPY", False)
+    streamed, _ = embed_both(tmp_path, cover_mode, "mixed", mode, message)
+    with Image.open(streamed) as a, Image.open(str(tmp_path / "expected.png")) as b:
+        assert a.tobytes() == b.tobytes()